@@ -0,0 +1,80 @@
+import os
+import tarfile
+import zipfile
+
+
+def is_xml_member(member_path):
+    """
+    Check whether an archive member is an xml file to convert. Directories and the resource fork files
+    macOS adds to archives (__MACOSX/, ._name.xml) are skipped
+    :param member_path: The path of the member within the archive
+    :return: Boolean for whether the member has an .xml extension and is not a resource fork file
+    """
+    member_name = os.path.basename(member_path)
+    if member_path.startswith("__MACOSX/") or member_name.startswith("._"):
+        return False
+
+    return os.path.splitext(member_name)[1] == ".xml"
+
+
+def iter_zip_members(archive_file, member_filter):
+    """
+    Read the members of a zip archive one at a time
+    :param archive_file: The path of the zip archive or a seekable binary file object
+    :param member_filter: Function which is given a member path and returns whether to read the member
+    :return: A generator of tuples with the member path and the member bytes
+    """
+    with zipfile.ZipFile(archive_file) as zip_archive:
+        for member_info in zip_archive.infolist():
+            if member_info.is_dir() or not member_filter(member_info.filename):
+                continue
+            with zip_archive.open(member_info) as member_file:
+                member_bytes = member_file.read()
+            yield member_info.filename, member_bytes
+
+
+def iter_tar_members(archive_file, member_filter):
+    """
+    Read the members of a tar archive one at a time in a single forward pass, so the archive is never seeked
+    and can be read from a pipe. The compression (gzip, bz2, xz or none) is detected from the data
+    :param archive_file: The path of the tar archive or a binary file object
+    :param member_filter: Function which is given a member path and returns whether to read the member
+    :return: A generator of tuples with the member path and the member bytes
+    """
+    if isinstance(archive_file, (str, os.PathLike)):
+        tar_archive = tarfile.open(archive_file, mode="r|*")
+    else:
+        tar_archive = tarfile.open(fileobj=archive_file, mode="r|*")
+    with tar_archive:
+        for member_info in tar_archive:
+            if not member_info.isfile() or not member_filter(member_info.name):
+                continue
+            member_file = tar_archive.extractfile(member_info)
+            if member_file is None:
+                continue
+            # In stream mode a member has to be read before moving on to the next one
+            member_bytes = member_file.read()
+            yield member_info.name, member_bytes
+
+
+def iter_archive_members(archive_file, member_filter=is_xml_member):
+    """
+    Read the xml files in a zip or tar (.tar, .tar.gz, .tgz, .tar.bz2, .tar.xz) archive one at a time
+    straight from the archive, without extracting it to disk
+    :param archive_file: The path of the archive, or a binary file object. Zip archives need a seekable file object
+    :param member_filter: Optional function which is given a member path and returns whether to read the member,
+    defaults to is_xml_member
+    :return: A generator of tuples with the member path and the member bytes
+    """
+    if isinstance(archive_file, (str, os.PathLike)):
+        is_zip = zipfile.is_zipfile(archive_file)
+    elif hasattr(archive_file, "seekable") and archive_file.seekable():
+        is_zip = zipfile.is_zipfile(archive_file)
+        archive_file.seek(0)
+    else:
+        is_zip = False
+
+    if is_zip:
+        return iter_zip_members(archive_file, member_filter)
+
+    return iter_tar_members(archive_file, member_filter)
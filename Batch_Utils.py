@@ -0,0 +1,393 @@
+from FGDC2SB import FGDC2SB
+from Timing_Utils import conversionTracer
+from Archive_Utils import iter_archive_members
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+import mmap
+import os
+
+# The conversion caches used by this worker process, so the cache size is only counted once per process
+worker_caches = {}
+
+# The converters used by this worker process, keyed by their options, so they are only set up once per process.
+# Converters are thread-safe, so the threads of a thread pool batch share them
+worker_converters = {}
+
+
+def get_worker_converter(check_email_deliverability=True, parser_pool=None):
+    """
+    Gets the converter this worker process uses for every record with the same options
+    :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups
+    :param parser_pool: Optional xmlParserPool with the parser settings
+    :return: An FGDC2SB converter with no input xml file, for use with convert
+    """
+    converter_key = check_email_deliverability
+    if parser_pool is not None:
+        converter_key = (check_email_deliverability, parser_pool.get_key())
+    converter = worker_converters.get(converter_key)
+    if converter is None:
+        converter = FGDC2SB(check_email_deliverability=check_email_deliverability, parser_pool=parser_pool)
+        worker_converters[converter_key] = converter
+
+    return converter
+
+
+def get_worker_cache(conversion_cache):
+    """
+    Gets the conversion cache this worker process uses for every chunk with the same cache settings
+    :param conversion_cache: A conversionCache, or None
+    :return: The conversionCache of this process with the same settings, or None
+    """
+    if conversion_cache is None:
+        return None
+    cache_id = (conversion_cache.cache_dir, conversion_cache.converter_version, conversion_cache.max_size)
+
+    return worker_caches.setdefault(cache_id, conversion_cache)
+
+
+def convert_source(result, input_xml_file, file_name, parent_id=None, source_url=None, streaming=False,
+                   check_email_deliverability=True, conversion_cache=None, tracer=None, fields=None,
+                   parser_pool=None):
+    """
+    Convert an xml file into a result dictionary, returning it from the conversion cache when it is unchanged
+    :param result: The result dictionary to set the item of
+    :param input_xml_file: The xml file to convert, as a path, bytes or a memory-mapped file. It has to be bytes
+    or a buffer when there is a conversion cache, so it can be hashed
+    :param file_name: The file name the extension is checked for
+    :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+    :param source_url: Optional parameter with the URL for original source
+    :param streaming: Optional boolean for whether to use the streaming parser
+    :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups
+    :param conversion_cache: Optional conversionCache to return unchanged records from
+    :param tracer: Optional conversionTracer
+    :param fields: Optional list of the sbjson item fields to create
+    :param parser_pool: Optional xmlParserPool with the parser settings
+    """
+    converter = get_worker_converter(check_email_deliverability, parser_pool)
+    cache_key = None
+    # Only files which would convert are looked up, so a cache hit never skips the file name check
+    if conversion_cache is not None and converter.check_file_extension(file_name) == True:
+        cache_key = conversion_cache.get_key(input_xml_file, parent_id, source_url, check_email_deliverability, fields,
+                                             converter.parser_pool, converter.include_footprint,
+                                             converter.footprint_tolerance)
+        result["item"] = conversion_cache.get(cache_key)
+    if result["item"] is None:
+        result["item"] = converter.convert(input_xml_file, parent_id=parent_id, source_url=source_url,
+                                           input_file_name=file_name, streaming=streaming, tracer=tracer,
+                                           fields=fields, keep_parsed=False)
+        if cache_key is not None:
+            conversion_cache.put(cache_key, result["item"])
+
+
+def convert_file(file_path, parent_id=None, source_url=None, streaming=False, check_email_deliverability=True,
+                 conversion_cache=None, trace=False, fields=None, parser_pool=None):
+    """
+    Convert a single xml file, catching any error so that one bad record does not stop a batch
+    :param file_path: The path of the xml file to convert
+    :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+    :param source_url: Optional parameter with the URL for original source
+    :param streaming: Optional boolean for whether to use the streaming parser
+    :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups
+    :param conversion_cache: Optional conversionCache to return unchanged records from
+    :param trace: Optional boolean for whether to record the stage stats of the conversion
+    :param fields: Optional list of the sbjson item fields to create
+    :param parser_pool: Optional xmlParserPool with the parser settings
+    :return: A dictionary with the file path, the converted item and the error message if the conversion failed.
+    When tracing, the stage stats of converted (not cached) records are under the "trace" key
+    """
+    result = {"file": file_path, "item": None, "error": None}
+    tracer = None
+    if trace == True:
+        tracer = conversionTracer()
+    try:
+        file_name = os.path.basename(file_path)
+        if conversion_cache is None or os.path.getsize(file_path) == 0:
+            # lxml parses straight from the path. Empty files can not be memory-mapped, and fail to parse
+            # with the same error as without the cache
+            convert_source(result, file_path, file_name, parent_id, source_url, streaming,
+                           check_email_deliverability, None, tracer, fields, parser_pool)
+        else:
+            # Memory-map the file so it can be hashed and then parsed without being copied into bytes
+            with open(file_path, "rb") as xml_file, mmap.mmap(xml_file.fileno(), 0, access=mmap.ACCESS_READ) as xml_map:
+                convert_source(result, xml_map, file_name, parent_id, source_url, streaming,
+                               check_email_deliverability, conversion_cache, tracer, fields, parser_pool)
+    except Exception as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+    if tracer is not None and len(tracer.records) > 0:
+        result["trace"] = tracer.records[0]
+
+    return result
+
+
+def convert_chunk(file_paths, parent_id=None, source_url=None, streaming=False, check_email_deliverability=True,
+                  conversion_cache=None, trace=False, fields=None, parser_pool=None):
+    """
+    Convert a chunk of xml files in a worker process
+    :param file_paths: A list of paths of xml files to convert
+    :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+    :param source_url: Optional parameter with the URL for original source
+    :param streaming: Optional boolean for whether to use the streaming parser
+    :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups
+    :param conversion_cache: Optional conversionCache to return unchanged records from
+    :param trace: Optional boolean for whether to record the stage stats of each conversion
+    :param fields: Optional list of the sbjson item fields to create
+    :param parser_pool: Optional xmlParserPool with the parser settings
+    :return: A list of result dictionaries in the same order as the file paths
+    """
+    conversion_cache = get_worker_cache(conversion_cache)
+    results = []
+    for file_path in file_paths:
+        results.append(convert_file(file_path, parent_id, source_url, streaming, check_email_deliverability,
+                                    conversion_cache, trace, fields, parser_pool))
+
+    return results
+
+
+def convert_member(member_path, member_bytes, parent_id=None, source_url=None, streaming=False,
+                   check_email_deliverability=True, conversion_cache=None, trace=False, fields=None,
+                   parser_pool=None):
+    """
+    Convert an xml file read from an archive, catching any error so that one bad record does not stop a batch
+    :param member_path: The path of the xml file within the archive
+    :param member_bytes: The bytes of the xml file
+    :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+    :param source_url: Optional parameter with the URL for original source
+    :param streaming: Optional boolean for whether to use the streaming parser
+    :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups
+    :param conversion_cache: Optional conversionCache to return unchanged records from
+    :param trace: Optional boolean for whether to record the stage stats of the conversion
+    :param fields: Optional list of the sbjson item fields to create
+    :param parser_pool: Optional xmlParserPool with the parser settings
+    :return: A dictionary with the member path under the "file" key, the converted item and the error message
+    if the conversion failed
+    """
+    result = {"file": member_path, "item": None, "error": None}
+    tracer = None
+    if trace == True:
+        tracer = conversionTracer()
+    try:
+        convert_source(result, member_bytes, os.path.basename(member_path), parent_id, source_url, streaming,
+                       check_email_deliverability, conversion_cache, tracer, fields, parser_pool)
+    except Exception as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+    if tracer is not None and len(tracer.records) > 0:
+        result["trace"] = tracer.records[0]
+
+    return result
+
+
+def convert_member_chunk(members, parent_id=None, source_url=None, streaming=False, check_email_deliverability=True,
+                         conversion_cache=None, trace=False, fields=None, parser_pool=None):
+    """
+    Convert a chunk of xml files read from an archive in a worker process
+    :param members: A list of tuples with the path of an xml file within the archive and its bytes
+    :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+    :param source_url: Optional parameter with the URL for original source
+    :param streaming: Optional boolean for whether to use the streaming parser
+    :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups
+    :param conversion_cache: Optional conversionCache to return unchanged records from
+    :param trace: Optional boolean for whether to record the stage stats of each conversion
+    :param fields: Optional list of the sbjson item fields to create
+    :param parser_pool: Optional xmlParserPool with the parser settings
+    :return: A list of result dictionaries in the same order as the members
+    """
+    conversion_cache = get_worker_cache(conversion_cache)
+    results = []
+    for member_path, member_bytes in members:
+        results.append(convert_member(member_path, member_bytes, parent_id, source_url, streaming,
+                                      check_email_deliverability, conversion_cache, trace, fields, parser_pool))
+
+    return results
+
+
+class batchConverter:
+
+    def __init__(self, max_workers=None, chunk_size=16, ordered=True, streaming=False, check_email_deliverability=True,
+                 conversion_cache=None, trace=False, fields=None, spatial_index=None,
+                 tag_vocabulary=None, keyword_statistics=None, use_threads=False, parser_pool=None):
+        """
+        Converts many xml files across a pool of worker processes, or of worker threads
+        :param max_workers: Optional number of worker processes or threads, defaults to the number of cpus
+        :param chunk_size: The number of files sent to a worker process at a time
+        :param ordered: Boolean for whether results are returned in input order or as soon as they finish
+        :param streaming: Optional boolean for whether the workers use the streaming parser
+        :param check_email_deliverability: Optional boolean for whether contact emails are checked with DNS lookups.
+        Set to False for workers without network access
+        :param conversion_cache: Optional conversionCache from Cache_Utils. Records whose bytes are unchanged since
+        they were last converted are returned from the cache without being parsed
+        :param trace: Optional boolean for whether to record the stage stats of every conversion.
+        The stats are aggregated across the batch in self.tracer
+        :param fields: Optional list of the sbjson item fields to create, e.g. ["title", "spatial", "tags"].
+        The section extractors for the other fields are not run
+        :param spatial_index: Optional spatialIndexBuilder from Index_Utils. The bounding box of every converted
+        item is added to it keyed by the file path, so spatial_index.build() can be called after the batch
+        :param tag_vocabulary: Optional tagVocabulary from Tag_Utils. The tags of the items returned by the workers
+        are replaced with shared interned tags, so a large batch held in memory keeps one copy of each tag
+        :param keyword_statistics: Optional keywordStatistics from Tag_Utils which counts the keywords of
+        every converted item as it is returned
+        :param use_threads: Optional boolean for whether to convert in a thread pool instead of a process pool.
+        lxml releases the GIL while parsing, so threads overlap reading and parsing without the memory of a
+        python process per worker or the cost of pickling items back from the workers
+        :param parser_pool: Optional xmlParserPool from Parser_Utils with the parser settings of the workers,
+        e.g. xmlParserPool(recover=True) so slightly broken files are converted instead of failing. Every worker
+        thread or process reuses its own parser
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.streaming = streaming
+        self.check_email_deliverability = check_email_deliverability
+        self.conversion_cache = conversion_cache
+        self.fields = fields
+        self.spatial_index = spatial_index
+        self.tag_vocabulary = tag_vocabulary
+        self.keyword_statistics = keyword_statistics
+        self.use_threads = use_threads
+        self.parser_pool = parser_pool
+        self.tracer = None
+        if trace == True:
+            self.tracer = conversionTracer()
+
+    def get_chunks(self, file_paths):
+        """
+        Split an iterable of file paths into lists of chunk_size paths without reading it all at once
+        :param file_paths: A list or iterator of file paths
+        :return: A generator of lists of file paths
+        """
+        chunk = []
+        for file_path in file_paths:
+            chunk.append(file_path)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def convert_files(self, file_paths, parent_id=None, source_url=None):
+        """
+        Convert xml files in worker processes or threads. Only a few chunks per worker are in flight at a time,
+        so a very long iterator of file paths is never read into memory all at once
+        :param file_paths: A list or iterator of paths of xml files
+        :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+        :param source_url: Optional parameter with the URL for original source
+        :return: A generator of result dictionaries with "file", "item" and "error" keys.
+        Failed records have an item of None and the error message
+        """
+        return self.convert_chunks(convert_chunk, self.get_chunks(file_paths), parent_id, source_url)
+
+    def convert_archive(self, archive_file, parent_id=None, source_url=None):
+        """
+        Convert the xml files in a zip or tar archive in worker processes or threads. The members are read one
+        at a time straight from the archive as the workers need them, without extracting the archive to disk
+        :param archive_file: The path of a .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz archive, or a binary
+        file object (seekable for zip archives)
+        :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+        :param source_url: Optional parameter with the URL for original source
+        :return: A generator of result dictionaries with one result per xml member, keyed by the member path
+        under the "file" key
+        """
+        return self.convert_chunks(convert_member_chunk, self.get_chunks(iter_archive_members(archive_file)),
+                                   parent_id, source_url)
+
+    def convert_chunks(self, chunk_function, chunks, parent_id=None, source_url=None):
+        """
+        Convert chunks of records in worker processes or threads, with only a few chunks per worker in flight
+        :param chunk_function: The function which converts a chunk, convert_chunk or convert_member_chunk
+        :param chunks: An iterator of chunks
+        :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+        :param source_url: Optional parameter with the URL for original source
+        :return: A generator of result dictionaries
+        """
+        max_workers = self.max_workers or os.cpu_count() or 1
+        max_in_flight = max_workers * 2
+        if self.use_threads:
+            pool_executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            pool_executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        with pool_executor as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(chunk_function, chunk, parent_id, source_url, self.streaming,
+                                               self.check_email_deliverability, self.conversion_cache,
+                                               self.tracer is not None, self.fields, self.parser_pool))
+                while len(pending) >= max_in_flight:
+                    for result in self.collect_finished(pending):
+                        yield result
+            while pending:
+                for result in self.collect_finished(pending):
+                    yield result
+
+    def collect_finished(self, pending):
+        """
+        Wait for chunks to finish and take them off of the pending queue
+        In ordered mode this waits for the oldest chunk, otherwise for whichever chunks finish first
+        :param pending: A deque of futures for submitted chunks
+        :return: A list of result dictionaries
+        """
+        results = []
+        if self.ordered:
+            future = pending.popleft()
+            results.extend(future.result())
+        else:
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                results.extend(future.result())
+
+        if self.tracer is not None:
+            for result in results:
+                if "trace" in result:
+                    self.tracer.add_record(result["trace"])
+        if self.tag_vocabulary is not None:
+            for result in results:
+                if result["item"] is not None and "tags" in result["item"]:
+                    result["item"]["tags"] = self.tag_vocabulary.intern_tags(result["item"]["tags"])
+        if self.keyword_statistics is not None:
+            for result in results:
+                self.keyword_statistics.add_item(result["item"])
+        if self.spatial_index is not None:
+            for result in results:
+                self.spatial_index.add_item(result["file"], result["item"])
+
+        return results
+
+    def write_files(self, file_paths, item_writer, parent_id=None, source_url=None):
+        """
+        Convert xml files in worker processes or threads and stream each item to an item writer
+        as soon as it is returned
+        :param file_paths: A list or iterator of paths of xml files
+        :param item_writer: An open itemWriter from Output_Utils
+        :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+        :param source_url: Optional parameter with the URL for original source
+        :return: A list of result dictionaries for the records which failed
+        """
+        return self.write_results(self.convert_files(file_paths, parent_id, source_url), item_writer)
+
+    def write_archive(self, archive_file, item_writer, parent_id=None, source_url=None):
+        """
+        Convert the xml files in a zip or tar archive and stream each item to an item writer as soon as it is returned
+        :param archive_file: The path of the archive, or a binary file object
+        :param item_writer: An open itemWriter from Output_Utils
+        :param parent_id: Optional parameter with the parent id for the sciencebase items to be created
+        :param source_url: Optional parameter with the URL for original source
+        :return: A list of result dictionaries for the records which failed
+        """
+        return self.write_results(self.convert_archive(archive_file, parent_id, source_url), item_writer)
+
+    def write_results(self, results, item_writer):
+        """
+        Write the items of converted records to an item writer
+        :param results: An iterator of result dictionaries
+        :param item_writer: An open itemWriter from Output_Utils
+        :return: A list of result dictionaries for the records which failed
+        """
+        failed_results = []
+        for result in results:
+            if result["error"] is not None:
+                failed_results.append(result)
+            else:
+                item_writer.write(result["item"])
+
+        return failed_results
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from Parser_Utils import default_parser_pool
+
+
+class conversionCache:
+
+    def __init__(self, cache_dir, converter_version=None, max_size=1073741824):
+        """
+        An on disk cache of converted sbjson items keyed by a hash of the input xml bytes, so records which
+        have not changed since the last harvest are returned without being parsed or converted
+        :param cache_dir: The directory to store cached items in
+        :param converter_version: Optional version of the mapping code, defaults to FGDC2SB.converter_version.
+        Items are stored in a directory per version, so changing the version invalidates everything cached
+        by older versions
+        :param max_size: The maximum size of the cache in bytes. The least recently used items are removed
+        when it grows past this size
+        """
+        if converter_version is None:
+            from FGDC2SB import FGDC2SB
+
+            converter_version = FGDC2SB.converter_version
+        self.cache_dir = cache_dir
+        self.converter_version = str(converter_version)
+        self.version_dir = os.path.join(cache_dir, self.converter_version)
+        self.max_size = max_size
+        # Size of the cache as seen by this process. Other processes sharing the directory also add items,
+        # so it is recounted from the directory before anything is evicted
+        self.current_size = None
+        # Guards current_size and eviction when the cache is shared by the threads of a thread pool batch
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks can not be pickled, so worker processes get a new lock with their copy of the cache
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def get_key(self, input_xml_file, parent_id=None, source_url=None, check_email_deliverability=True, fields=None,
+                parser_pool=None, include_footprint=False, footprint_tolerance=0.0):
+        """
+        Create the cache key for an input xml file and the options which change the converted item
+        :param input_xml_file: The bytes of the input xml file, or a bytes-like buffer such as a memory-mapped file
+        :param parent_id: Optional parameter with the parent id for the sciencebase item
+        :param source_url: Optional parameter with the URL for original source
+        :param check_email_deliverability: Boolean for whether contact emails are checked with DNS lookups
+        :param fields: Optional list of the sbjson item fields which are created
+        :param parser_pool: Optional xmlParserPool the file is parsed with, defaults to the default parser pool.
+        Settings such as recover change the item converted from the same bytes
+        :param include_footprint: Boolean for whether the item has a GeoJSON footprint
+        :param footprint_tolerance: The simplification tolerance of the footprint
+        :return: A hex string key
+        """
+        if fields is not None:
+            fields = sorted(fields)
+        if parser_pool is None:
+            parser_pool = default_parser_pool
+        options = json.dumps([self.converter_version, parent_id, source_url, check_email_deliverability, fields,
+                              parser_pool.get_settings(), include_footprint, footprint_tolerance], sort_keys=True)
+        key_hash = hashlib.sha256(options.encode("utf-8"))
+        key_hash.update(b"\0")
+        key_hash.update(input_xml_file)
+
+        return key_hash.hexdigest()
+
+    def get_item_path(self, key):
+        """
+        Gets the path of the file a cached item is stored in
+        :param key: The cache key
+        :return: The path of the cached item file
+        """
+        return os.path.join(self.version_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        """
+        Get a cached item and mark it as recently used
+        :param key: The cache key
+        :return: The cached item dictionary, or None if the key is not in the cache
+        """
+        item_path = self.get_item_path(key)
+        try:
+            with open(item_path, "rb") as item_file:
+                item_data = json.loads(item_file.read())
+            os.utime(item_path)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        return item_data
+
+    def put(self, key, item_data):
+        """
+        Store a converted item in the cache, removing old items if the cache has grown too large
+        :param key: The cache key
+        :param item_data: The sbjson item dictionary
+        """
+        item_path = self.get_item_path(key)
+        item_dir = os.path.dirname(item_path)
+        os.makedirs(item_dir, exist_ok=True)
+        item_json = json.dumps(item_data).encode("utf-8")
+        # Write to a temporary file first so other processes never read a partly written item
+        temp_fd, temp_path = tempfile.mkstemp(dir=item_dir, suffix=".tmp")
+        with os.fdopen(temp_fd, "wb") as temp_file:
+            temp_file.write(item_json)
+        os.replace(temp_path, item_path)
+
+        with self.lock:
+            if self.current_size is None:
+                self.current_size = self.get_cache_size()
+            else:
+                self.current_size += len(item_json)
+            if self.current_size > self.max_size:
+                self.evict()
+
+    def get_cached_files(self):
+        """
+        Gets all of the cached item files for this converter version
+        :return: A list of tuples with the last used time, size and path of each cached item file
+        """
+        cached_files = []
+        if not os.path.isdir(self.version_dir):
+            return cached_files
+        for sub_dir in os.scandir(self.version_dir):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                cached_files.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+
+        return cached_files
+
+    def get_cache_size(self):
+        """
+        Count the size of the cache for this converter version
+        :return: The size of the cached items in bytes
+        """
+        cache_size = 0
+        for last_used, file_size, file_path in self.get_cached_files():
+            cache_size += file_size
+
+        return cache_size
+
+    def evict(self):
+        """
+        Remove the least recently used items until the cache is back under 90% of its maximum size
+        """
+        cached_files = self.get_cached_files()
+        cache_size = 0
+        for last_used, file_size, file_path in cached_files:
+            cache_size += file_size
+        target_size = self.max_size * 0.9
+        cached_files.sort()
+        for last_used, file_size, file_path in cached_files:
+            if cache_size <= target_size:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            cache_size -= file_size
+        self.current_size = cache_size
+
+    def clear(self):
+        """
+        Remove every cached item for this converter version
+        """
+        shutil.rmtree(self.version_dir, ignore_errors=True)
+        self.current_size = 0
+
+    def remove_old_versions(self):
+        """
+        Remove the cached items of every other converter version
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and entry.name != self.converter_version:
+                shutil.rmtree(entry.path, ignore_errors=True)
@@ -1,6 +1,187 @@
+from functools import lru_cache
 import re
 import datetime
 
+"""
+The date and time formats which can be read from the xml file, compiled once when the module is imported.
+Each list is checked in order and the formats do not overlap, so the first match is the format
+"""
+date_formats = [('8_char_format', re.compile(r'^\d{8}$')),
+                ('%Y-%m-%d', re.compile(r'^\d{4}-(\d{2}|\d{1})-(\d{2}|\d{1})$')),
+                ('6_char_format', re.compile(r'^\d{6}$')),
+                ('%Y-%m', re.compile(r'^\d{4}-(\d{2}|\d{1})$')),
+                ('%Y', re.compile(r'^\d{4}$'))]
+
+time_formats = [('%H%M%S%f%z', re.compile(r'^\d{8}-\d{4}$')),
+                ('%H:%M:%S.%f%z', re.compile(r'^\d{2}:\d{2}:\d{2}.\d{2}-\d{4}$')),
+                ('%H%M%S%f', re.compile(r'^\d{8}$')),
+                ('%H:%M:%S.%f', re.compile(r'^\d{2}:\d{2}:\d{2}.\d{2}$')),
+                ('%H%M%S%z', re.compile(r'^\d{6}-\d{4}$')),
+                ('%H:%M:%S%z', re.compile(r'^\d{2}:\d{2}:\d{2}-\d{4}$')),
+                ('%H%M%S', re.compile(r'^\d{6}$')),
+                ('%H:%M:%S', re.compile(r'^\d{2}:\d{2}:\d{2}$')),
+                ('%H%M', re.compile(r'^\d{4}$')),
+                ('%H:%M', re.compile(r'^\d{2}:\d{2}$')),
+                ('%H', re.compile(r'^\d{2}$'))]
+
+compact_time_formats = ['%H%M%S%f%z', '%H%M%S%f', '%H%M%S%z', '%H%M%S']
+colon_time_formats = ['%H:%M:%S.%f%z', '%H:%M:%S.%f', '%H:%M:%S%z']
+# Already in an sbjson time format, so these are only checked for being a real time of day
+sbjson_time_formats = ['%H:%M:%S', '%H:%M', '%H']
+
+
+@lru_cache(maxsize=4096)
+def get_date_format(date_string):
+    """
+    Find the format of a date string from the xml file
+    :param date_string: The date string
+    :return: The date format, or an empty string if the date string is not in a valid format
+    """
+    for key, df_regex_pattern in date_formats:
+        if df_regex_pattern.match(date_string):
+            if key == '8_char_format':
+                if int(date_string[:2]) >= 13:
+                    return '%Y%m%d'
+                return '%m%d%Y'
+            if key == '6_char_format':
+                if int(date_string[:2]) >= 13:
+                    return '%Y%m'
+                return '%m%Y'
+            return key
+
+    return ""
+
+
+@lru_cache(maxsize=4096)
+def get_time_format(time_string):
+    """
+    Find the format of a time string from the xml file
+    :param time_string: The time string
+    :return: The time format, or an empty string if the time string is not in a valid format
+    """
+    for key, tf_regex_pattern in time_formats:
+        if tf_regex_pattern.match(time_string):
+            return key
+
+    return ""
+
+
+def format_date_string(date_string, input_format):
+    """
+    Converts a date string to one of the acceptable sbjson date formats
+    :param date_string: The date string
+    :param input_format: The format of the date string
+    :return: The date string in the proper date format
+    Raises a ValueError if the date is not a real calendar date
+    """
+    if input_format == '%Y%m':
+        return datetime.date(int(date_string[:4]), int(date_string[4:6]), 1).isoformat()[:7]
+    if input_format == '%m%Y':
+        return datetime.date(int(date_string[2:6]), int(date_string[:2]), 1).isoformat()[:7]
+    if input_format == '%Y%m%d':
+        return datetime.date(int(date_string[:4]), int(date_string[4:6]), int(date_string[6:8])).isoformat()
+    if input_format == '%m%d%Y':
+        return datetime.date(int(date_string[4:8]), int(date_string[:2]), int(date_string[2:4])).isoformat()
+    # The month and day can be given without a leading zero, so these are written back zero padded
+    if input_format == '%Y-%m-%d':
+        return datetime.datetime.strptime(date_string, input_format).date().isoformat()
+    if input_format == '%Y-%m':
+        return datetime.datetime.strptime(date_string, input_format).date().isoformat()[:7]
+
+    return date_string
+
+
+def format_time_string(time_string, input_format):
+    """
+    Converts a time string to one of the acceptable sbjson time formats
+    :param time_string: The time string
+    :param input_format: The format of the time string
+    :return: The time string in the proper time format
+    Raises a ValueError if the time is not a real time of day
+    """
+    if input_format == '%H%M':
+        return datetime.time(int(time_string[:2]), int(time_string[2:4])).isoformat()[:5]
+    if input_format in compact_time_formats:
+        return datetime.time(int(time_string[:2]), int(time_string[2:4]), int(time_string[4:6])).isoformat()
+    if input_format in colon_time_formats:
+        return datetime.time(int(time_string[:2]), int(time_string[3:5]), int(time_string[6:8])).isoformat()
+    if input_format in sbjson_time_formats:
+        datetime.datetime.strptime(time_string, input_format)
+
+    return time_string
+
+
+@lru_cache(maxsize=16384)
+def normalize_date_string(date_string):
+    """
+    Check and convert a date string from the xml file in one call. Results are cached
+    since the same dates repeat across the records of a harvest
+    :param date_string: The date string
+    :return: The date string in the proper sbjson date format, or an empty string if it is not a valid date
+    """
+    if not date_string:
+        return ""
+    date_format = get_date_format(date_string)
+    if not date_format:
+        return ""
+    try:
+        return format_date_string(date_string, date_format)
+    except ValueError:
+        return ""
+
+
+@lru_cache(maxsize=16384)
+def normalize_time_string(time_string):
+    """
+    Check and convert a time string from the xml file in one call. Results are cached
+    since the same times repeat across the records of a harvest
+    :param time_string: The time string
+    :return: The time string in the proper sbjson time format, or an empty string if it is not a valid time
+    """
+    if not time_string:
+        return ""
+    time_format = get_time_format(time_string)
+    if not time_format:
+        return ""
+    try:
+        return format_time_string(time_string, time_format)
+    except ValueError:
+        return ""
+
+
+def normalize_datetime(date_string=None, time_string=None):
+    """
+    Create the sbjson date string for a date and an optional time from the xml file
+    :param date_string: Optional date string
+    :param time_string: Optional time string
+    :return: The normalized date and time joined with a "T". A time is only added to a full
+    year-month-day date, and is returned on its own if there is no valid date
+    """
+    normalized_date = normalize_date_string(date_string)
+    normalized_time = normalize_time_string(time_string)
+    if normalized_date:
+        if normalized_time and len(normalized_date) == 10:
+            return normalized_date + "T" + normalized_time
+        return normalized_date
+
+    return normalized_time
+
+
+def normalize_datetimes(datetime_pairs):
+    """
+    Create the sbjson date strings for many dates and times at once, normalizing each distinct
+    date and time pair only once. Records with many dates repeat the same few values
+    :param datetime_pairs: A list of tuples with a date string and a time string, either of which may be None
+    :return: A list with the normalized date string of each pair, see normalize_datetime
+    """
+    normalized_pairs = {}
+    for datetime_pair in datetime_pairs:
+        if datetime_pair not in normalized_pairs:
+            normalized_pairs[datetime_pair] = normalize_datetime(datetime_pair[0], datetime_pair[1])
+
+    return [normalized_pairs[datetime_pair] for datetime_pair in datetime_pairs]
+
+
 class datetimeHandler:
 
     def __init__(self, datetime_string):
@@ -11,60 +192,18 @@ class datetimeHandler:
         Check a date string object from the xml file to make sure it is in a valid date format
         :return: boolean value for whether the date string has a valid format, and the format
         """
-        date_formats = {'8_char_format': '^\d{8}$',
-                        '%Y-%m-%d': '^\d{4}-(\d{2}|\d{1})-(\d{2}|\d{1})$',
-                        '6_char_format': '^\d{6}$',
-                        '%Y-%m': '^\d{4}-(\d{2}|\d{1})$',
-                        '%Y': '^\d{4}$'}
-
-        is_valid_format = False
-        date_format = ""
-        df_keys = list(date_formats.keys())
-        for key in df_keys:
-            df_regex_pattern = re.compile(date_formats[key])
-            df_matcher = df_regex_pattern.match(self.datetime_string)
-            if df_matcher:
-                is_valid_format = True
-                date_format = key
-                if date_format == '8_char_format':
-                    if int(self.datetime_string[:2]) >= 13:
-                        date_format = '%Y%m%d'
-                    else:
-                        date_format = '%m%d%Y'
-                if date_format == '6_char_format':
-                    if int(self.datetime_string[:2]) >= 13:
-                        date_format = '%Y%m'
-                    else:
-                        date_format = '%m%Y'
-
-        return is_valid_format, date_format
+        date_format = get_date_format(self.datetime_string)
+
+        return date_format != "", date_format
 
     def test_time_string(self):
         """
         Check a time string object from the xml file to make sure it is in a valid date format
         :return: boolean value for whether the time string has a valid format, and the format
         """
-        time_formats = {'%H%M%S%f%z': '/^\d{8}-\d{4}$/',
-                        '%H:%M:%S.%f%z': '/^\d{2}:\d{2}:\d{2}.\d{2}-\d{4}$/',
-                        '%H%M%S%f': '/^\d{8}$/',
-                        '%H:%M:%S.%f': '/^\d{2}:\d{2}:\d{2}.\d{2}$/',
-                        '%H%M%S%z': '/^\d{6}-\d{4}$/',
-                        '%H:%M:%S%z': '/^\d{2}:\d{2}:\d{2}-\d{4}$/',
-                        '%H%M%S': '/^\d{6}$/',
-                        '%H:%M:%S': '/^\d{2}:\d{2}:\d{2}$/',
-                        '%H%M': '/^\d{4}$/',
-                        '%H:%M': '/^\d{2}:\d{2}$/',
-                        '%H': '/^\d{2}$/'}
-        is_valid_format = False
-        time_format = ""
-        tf_keys = list(time_formats.keys())
-        for key in tf_keys:
-            tf_regex_pattern = re.compile(time_formats[key])
-            tf_matcher = tf_regex_pattern.match(self.datetime_string)
-            if tf_matcher:
-                is_valid_format = True
-                time_format = key
-        return is_valid_format, time_format
+        time_format = get_time_format(self.datetime_string)
+
+        return time_format != "", time_format
 
     def convert_date_format(self, input_format):
         """
@@ -73,15 +212,7 @@ class datetimeHandler:
         :param input_format: the format of the input date string
         :return: the output date string in the proper date format
         """
-        output_date_string = self.datetime_string
-        if input_format in ['%Y%m', '%m%Y']:
-            date_string = datetime.datetime.strptime(self.datetime_string, input_format)
-            output_date_string = date_string.strftime('%Y-%m')
-        if input_format in ['%Y%m%d', '%m%d%Y']:
-            date_string = datetime.datetime.strptime(self.datetime_string, input_format)
-            output_date_string = date_string.strftime('%Y-%m-%d')
-
-        return output_date_string
+        return format_date_string(self.datetime_string, input_format)
 
     def convert_time_format(self, input_format):
         """
@@ -90,17 +221,4 @@ class datetimeHandler:
         :param input_format: the format of the input time string
         :return: the output time string in the proper time format
         """
-        output_time_string = self.datetime_string
-        if input_format == '%H%M':
-            time_string = datetime.datetime.strptime(self.datetime_string, input_format)
-            output_time_string = time_string.strftime('%H:%M')
-        if input_format in ['%H%M%S%f%z', '%H:%M:%S.%f%z', '%H%M%S%f', '%H:%M:%S.%f', '%H%M%S%z', '%H:%M:%S%z', '%H%M%S']:
-            time_string = datetime.datetime.strptime(self.datetime_string, input_format)
-            output_time_string = time_string.strftime('%H:%M:%S')
-
-        return output_time_string
-
-
-
-
-
+        return format_time_string(self.datetime_string, input_format)
@@ -0,0 +1,24 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=16384)
+def is_valid_email(email_address, check_deliverability=True):
+    """
+    Verify that an email address value is a valid email address. Results are cached for the
+    whole process since the same contact addresses appear in almost every record
+    :param email_address: The email address string
+    :param check_deliverability: Boolean for whether to also check the domain with DNS lookups.
+    Set to False for an offline, syntax only check
+    :return: boolean value for whether the email address is valid
+    """
+    if not email_address:
+        return False
+    # email_validator and dnspython are slow to import, so they are only imported for the first email checked
+    from email_validator import validate_email, EmailNotValidError
+
+    try:
+        validate_email(email_address, check_deliverability=check_deliverability)
+    except EmailNotValidError:
+        return False
+
+    return True
@@ -1,73 +1,162 @@
-from Datetime_Utils import datetimeHandler
+from Datetime_Utils import normalize_datetime, normalize_datetimes
 from Weblink_Utils import webLinkHandler
 from Citation_Utils import citationHandler
-from lxml import etree as etree
-from email_validator import validate_email, EmailNotValidError
-from io import BytesIO
-import decimal
+from Walker_Utils import documentWalker, subtreeIndex, walkerPaths
+from Stream_Utils import streamingParser
+from Parser_Utils import default_parser_pool
+from Email_Utils import is_valid_email
+from Input_Utils import open_xml_source, get_source_name
+from Lazy_Utils import lazyItem
+from Party_Utils import partyCache
+from Spatial_Utils import parse_rings, get_ring_extent, combine_extents, create_footprint
 import re
 import os
-import json
+import threading
 
 
 class FGDC2SB:
 
-    def __init__(self, input_file_name, input_xml_file):
+    # Bump when the mapping changes, so items cached by older versions of the mapping are not reused
+    converter_version = "6"
+
+    # Contact entries built from cntinfo elements, shared by every converter in the process.
+    # Set to None to build every contact from its xml
+    party_cache = partyCache()
+
+    # Set to a tagVocabulary to give records the same shared tag dictionaries for the same keywords
+    tag_vocabulary = None
+
+    # The split up walker_xpaths of each converter class, so they are only split up once per process
+    walker_paths = {}
+
+    #Lists of proper attribute orders for various data type
+    citation_facet_order = ["citationType", "note", "edition", "parts"]
+    contact_order = ["name", "type", "contactType", "organizationsPerson", "ttyPhone", "hours", "instructions",
+                     "email", "jobTitle", "organization", "primaryLocation"]
+    primary_location_order = ["officePhone", "faxPhone", "streetAddress", "mailAddress"]
+    web_link_order = ["type", "uri", "rel", "title", "hidden", "length"]
+
+    """
+    The xpath_* variables are used to define the path to navigate
+    to in the xml file to retrieve a particular set of data
+    """
+    xpath_title = "idinfo/citation/citeinfo/title"
+    xpath_abstract = "idinfo/descript/abstract"
+    xpath_purpose = "idinfo/descript/purpose"
+    xpath_supplemental = "idinfo/descript/supplinf"
+    xpath_onlink = "idinfo/citation/citeinfo/onlink"
+    xpath_browse_image = "//browse"
+    xpath_network_resource = "//networkr"
+    xpath_digital_form = "//digform"
+    xpath_westbc = "idinfo/spdom/bounding/westbc"
+    xpath_westbc_new = "idinfo/rseSpdom/bounding/westbc"
+    xpath_eastbc = "idinfo/spdom/bounding/eastbc"
+    xpath_eastbc_new = "idinfo/rseSpdom/bounding/eastbc"
+    xpath_northbc = "idinfo/spdom/bounding/northbc"
+    xpath_northbc_new = "idinfo/rseSpdom/bounding/northbc"
+    xpath_southbc = "idinfo/spdom/bounding/southbc"
+    xpath_southbc_new = "idinfo/rseSpdom/bounding/southbc"
+    xpath_bounding = "idinfo/spdom/bounding"
+    xpath_bounding_new = "idinfo/rseSpdom/bounding"
+    xpath_polygon = "idinfo/spdom/dsgpoly"
+    xpath_origin = "idinfo/citation/citeinfo/origin"
+    xpath_themekey = "idinfo/keywords/theme"
+    xpath_placekey = "idinfo/keywords/place"
+    xpath_process_description = "dataqual/lineage/procstep/procdesc"
+    xpath_process_contact = "dataqual/lineage/procstep/proccont/cntinfo"
+    xpath_contact_point = "idinfo/ptcontac/cntinfo"
+    xpath_contact_distribution = "distinfo/distrib/cntinfo"
+    xpath_contact_metadata = "metainfo/metc/cntinfo"
+    xpath_eainfo = "eainfo"
+    xpath_pubdate = "idinfo/citation/citeinfo/pubdate"
+    xpath_pubtime = "idinfo/citation/citeinfo/pubtime"
+    xpath_timeperiod = "idinfo/timeperd/timeinfo"
+    xpath_publish = "idinfo/citation/citeinfo/pubinfo/publish"
+    xpath_publisher = "idinfo/citation/citeinfo/pubinfo/publisher"
+    xpath_parentid = "idinfo/citation/citeinfo/lworkcit/citeinfo/onlink"
+    xpath_citation_info = "idinfo/citation/citeinfo"
+    xpath_main_update_freq = "idinfo/status/update"
+
+    """
+    The xml paths collected by the document walker in a single pass over the xml file
+    """
+    walker_xpaths = [xpath_title, xpath_abstract, xpath_purpose, xpath_supplemental,
+                     xpath_onlink, xpath_browse_image, xpath_network_resource,
+                     xpath_digital_form, xpath_bounding, xpath_bounding_new, xpath_polygon,
+                     xpath_origin, xpath_themekey, xpath_placekey,
+                     xpath_process_contact, xpath_contact_point, xpath_contact_distribution,
+                     xpath_contact_metadata, xpath_eainfo, xpath_pubdate, xpath_pubtime,
+                     xpath_timeperiod, xpath_publish, xpath_publisher,
+                     xpath_parentid, xpath_citation_info, xpath_main_update_freq]
+
+    """
+    The walker_xpaths which the streaming parser only keeps as empty elements, since they are only checked for
+    existence. The subtrees of the other walker_xpaths are kept (see get_streaming_parser) and everything else
+    is cleared as it is read
+    """
+    streaming_existence_xpaths = [xpath_eainfo]
+
+    """
+    The fields of an sbjson item in the order they are added to the item
+    """
+    item_fields = ["identifiers", "title", "summary", "body", "citation", "purpose",
+                   "maintenanceUpdateFrequency", "parentId", "contacts", "webLinks", "tags", "dates", "spatial"]
+
+    """
+    The regex patterns used to search strings
+    """
+
+    mail_regex_pattern = re.compile('mail', re.IGNORECASE)
+    gda_id_regex_pattern = re.compile('/.+?"gdaId"\s*:\s*"?(\d+)"?\s*.+/')
+    basis_id_regex_pattern = re.compile('/\s*This project is (.+?) in the USGS BASIS\+ system.\s*/')
+
+    def __init__(self, input_file_name=None, input_xml_file=None, check_email_deliverability=True,
+                 include_footprint=False, footprint_tolerance=0.0, parser_pool=None):
+        """
+        The xml paths, key orders and regex patterns are set up once for the class, so a converter can be
+        kept for a whole harvest and given each document with convert
+        A converter can be shared by threads calling convert, create_item or create_lazy_item at the same time.
+        Every conversion keeps its state in its own item state dictionary, the document kept by convert is kept
+        per thread, and the caches shared across records (party_cache, tag_vocabulary and the lru caches of the
+        utility modules) are locked or thread-safe
+        :param input_file_name: Optional name of the input xml file for create_item. If input_xml_file is not given
+        this is the path of the xml file to convert
+        :param input_xml_file: Optional xml file to convert as bytes, a file system path, an open binary file
+        object or a memory-mapped buffer. Paths, files and buffers are parsed directly without being read into bytes
+        :param check_email_deliverability: Optional boolean, set to False to validate contact email addresses
+        offline, without DNS lookups
+        :param include_footprint: Optional boolean, set to True to add a GeoJSON footprint of the G-Polygons
+        (dsgpoly) to the spatial data
+        :param footprint_tolerance: Optional simplification tolerance in degrees for the footprint rings.
+        0 keeps every vertex
+        :param parser_pool: Optional xmlParserPool from Parser_Utils with the parser settings, e.g.
+        xmlParserPool(recover=True) for slightly broken partner files. Defaults to a pool which removes blank text
+        and never resolves entities, loads DTDs or touches the network
+        """
+        if input_xml_file is None:
+            input_xml_file = input_file_name
+        if input_file_name is None:
+            input_file_name = get_source_name(input_xml_file)
         self.input_file = input_xml_file
         self.input_file_name = input_file_name
-
-        #Lists of proper attribute orders for various data type
-        self.citation_facet_order = ["citationType", "note", "edition", "parts"]
-        self.contact_order = ["name", "type", "contactType", "organizationsPerson", "ttyPhone", "hours", "instructions",
-                              "email", "jobTitle", "organization", "primaryLocation"]
-        self.primary_location_order = ["officePhone", "faxPhone", "streetAddress", "mailAddress"]
-        self.web_link_order = ["type", "uri", "rel", "title", "hidden"]
-
-        """
-        The self.xpath_* variables are used to define the path to navigate
-        to in the xml file to retrieve a particular set of data
-        """
-        self.xpath_title = "idinfo/citation/citeinfo/title"
-        self.xpath_abstract = "idinfo/descript/abstract"
-        self.xpath_purpose = "idinfo/descript/purpose"
-        self.xpath_supplemental = "idinfo/descript/supplinf"
-        self.xpath_onlink = "idinfo/citation/citeinfo/onlink"
-        self.xpath_browse_image = "//browse"
-        self.xpath_network_resource = "//networkr"
-        self.xpath_westbc = "idinfo/spdom/bounding/westbc"
-        self.xpath_westbc_new = "idinfo/rseSpdom/bounding/westbc"
-        self.xpath_eastbc = "idinfo/spdom/bounding/eastbc"
-        self.xpath_eastbc_new = "idinfo/rseSpdom/bounding/eastbc"
-        self.xpath_northbc = "idinfo/spdom/bounding/northbc"
-        self.xpath_northbc_new = "idinfo/rseSpdom/bounding/northbc"
-        self.xpath_southbc = "idinfo/spdom/bounding/southbc"
-        self.xpath_southbc_new = "idinfo/rseSpdom/bounding/southbc"
-        self.xpath_origin = "idinfo/citation/citeinfo/origin"
-        self.xpath_themekey = "idinfo/keywords/theme"
-        self.xpath_placekey = "idinfo/keywords/place"
-        self.xpath_process_description = "dataqual/lineage/procstep/procdesc"
-        self.xpath_process_contact = "dataqual/lineage/procstep/proccont/cntinfo"
-        self.xpath_contact_point = "idinfo/ptcontac/cntinfo"
-        self.xpath_contact_distribution = "distinfo/distrib/cntinfo"
-        self.xpath_contact_metadata = "metainfo/metc/cntinfo"
-        self.xpath_eainfo = "eainfo"
-        self.xpath_pubdate = "idinfo/citation/citeinfo/pubdate"
-        self.xpath_pubtime = "idinfo/citation/citeinfo/pubtime"
-        self.xpath_timeperiod = "idinfo/timeperd/timeinfo"
-        self.xpath_publish = "idinfo/citation/citeinfo/pubinfo/publish"
-        self.xpath_publisher = "idinfo/citation/citeinfo/pubinfo/publisher"
-        self.xpath_transfersize = "distinfo/stdorder/digform/digtinfo/transize"
-        self.xpath_parentid = "idinfo/citation/citeinfo/lworkcit/citeinfo/onlink"
-        self.xpath_citation_info = "idinfo/citation/citeinfo"
-        self.xpath_main_update_freq = "idinfo/status/update"
-
-        """
-        The regex patterns used to search strings
-        """
-
-        self.mail_regex_pattern = re.compile('mail', re.IGNORECASE)
-        self.gda_id_regex_pattern = re.compile('/.+?"gdaId"\s*:\s*"?(\d+)"?\s*.+/')
-        self.basis_id_regex_pattern = re.compile('/\s*This project is (.+?) in the USGS BASIS\+ system.\s*/')
+        self.check_email_deliverability = check_email_deliverability
+        self.include_footprint = include_footprint
+        self.footprint_tolerance = footprint_tolerance
+        if parser_pool is None:
+            parser_pool = default_parser_pool
+        self.parser_pool = parser_pool
+        # Holds the last document parsed by convert in each thread, so other renderings of it are not parsed again
+        self.thread_state = threading.local()
+
+    def __getstate__(self):
+        # Thread locals can not be pickled, so a converter sent to a worker process starts without a kept document
+        state = dict(self.__dict__)
+        del state["thread_state"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.thread_state = threading.local()
 
     def check_file_extension(self, file_name):
         """
@@ -120,12 +209,25 @@ class FGDC2SB:
     def get_xpath_sub_elements(self, root_element, single_item=False, element_name=None):
         """
         Find xml elements within an xml element
-        :param root_element: The xml element to search for elements within
+        :param root_element: The xml element to search for elements within, or a subtreeIndex of it
+        (see get_subtree_index) when looking up several elements within the same xml element
         :param single_item: Boolean for whether to return a single element or a list of elements
         Should only be set to true if it is certain that there will only be one element returned
         :param element_name: Optional parameter to only search for elements with a specific name
         :return: An lxml etree element or list of lxml etree objects
         """
+        if isinstance(root_element, subtreeIndex):
+            if element_name:
+                if single_item == True:
+                    return root_element.first(element_name)
+                return list(root_element.all(element_name))
+            root_element = root_element.root_element
+
+        if single_item == True:
+            if element_name:
+                return next(root_element.iter(element_name), None)
+            return next(root_element.iter(), None)
+
         sub_elements = []
         if element_name:
             for sub_element in root_element.iter(element_name):
@@ -133,14 +235,21 @@ class FGDC2SB:
         else:
             for sub_element in root_element.iter():
                 sub_elements.append(sub_element)
-        if single_item == True:
-            if len(sub_elements) > 0:
-                sub_elements = sub_elements[0]
-            else:
-                sub_elements = None
 
         return sub_elements
 
+    def get_subtree_index(self, element):
+        """
+        Index the elements within an xml element by tag, to pass to get_xpath_sub_elements in place of the
+        element when several elements are looked up within it
+        :param element: The xml element, or a subtreeIndex which is returned as is
+        :return: A subtreeIndex for the element
+        """
+        if isinstance(element, subtreeIndex):
+            return element
+
+        return subtreeIndex(element)
+
     def get_xpath_parent_elements(self, root_element, num_iterations, iteration_num=0):
         """
         Gets the parent element for an xml element
@@ -226,54 +335,121 @@ class FGDC2SB:
 
         return identifiers
 
+    def get_bounding_extent(self, bounding_elm):
+        """
+        Gets the extent of a bounding element. A west coordinate greater than the east coordinate
+        means the box crosses the antimeridian, unless the coordinates were just entered in the wrong order
+        :param bounding_elm: The bounding xml element
+        :return: A tuple with the west, east, south and north coordinates, or None if a coordinate is missing
+        or is not a number
+        """
+        bounding_index = self.get_subtree_index(bounding_elm)
+        coordinates = []
+        for element_name in ["westbc", "eastbc", "southbc", "northbc"]:
+            coordinate_elm = self.get_xpath_sub_elements(root_element=bounding_index, single_item=True,
+                                                         element_name=element_name)
+            if coordinate_elm is None or not coordinate_elm.text:
+                return None
+            try:
+                coordinates.append(float(coordinate_elm.text))
+            except ValueError:
+                return None
+        west, east, south, north = coordinates
+        # Boxes which would span more than half the globe across the antimeridian have their
+        # west and east coordinates swapped instead
+        if west > east and (east - west) % 360 > 180:
+            west, east = east, west
+        if north < south:
+            south, north = north, south
+
+        return west, east, south, north
+
+    def get_polygon_rings(self, polygon_elm):
+        """
+        Gets the ring text of the outer and exclusion G-Rings of a G-Polygon. Rings given as
+        G-Ring points (grngpoin) are joined into the same text form as a G-Ring (gring)
+        :param polygon_elm: The dsgpoly xml element
+        :return: A list of tuples with the tag of the ring element (dsgpolyo or dsgpolyx) and the ring text
+        """
+        ring_texts = []
+        for ring_elm in polygon_elm:
+            if ring_elm.tag not in ("dsgpolyo", "dsgpolyx"):
+                continue
+            ring_index = self.get_subtree_index(ring_elm)
+            gring_elm = self.get_xpath_sub_elements(root_element=ring_index, single_item=True, element_name="gring")
+            if gring_elm is not None:
+                ring_texts.append((ring_elm.tag, gring_elm.text))
+                continue
+            ring_points = []
+            for point_elm in self.get_xpath_sub_elements(root_element=ring_index, element_name="grngpoin"):
+                point_index = self.get_subtree_index(point_elm)
+                latitude_elm = self.get_xpath_sub_elements(root_element=point_index, single_item=True,
+                                                           element_name="gringlat")
+                longitude_elm = self.get_xpath_sub_elements(root_element=point_index, single_item=True,
+                                                            element_name="gringlon")
+                if latitude_elm is not None and longitude_elm is not None and latitude_elm.text and longitude_elm.text:
+                    ring_points.append(longitude_elm.text.strip() + " " + latitude_elm.text.strip())
+            ring_texts.append((ring_elm.tag, ", ".join(ring_points)))
+
+        return ring_texts
+
     def create_bounding_box(self, xml_data):
         """
-        Generate a bounding box from the geographic coordinate data
+        Generate a bounding box covering every bounding box and G-Polygon in the geographic coordinate data,
+        and optionally a footprint of the G-Polygons
         :param xml_data: The parsed xml file object
-        :return: A dictionary with the geographic coordinates for the bounding box
+        :return: A dictionary with the geographic coordinates for the bounding box. If the bounding box crosses
+        the antimeridian minX is greater than maxX
         """
-        west_bc = self.get_xpath_text(xml_data, self.xpath_westbc, single_item=True)
-        if not west_bc:
-            west_bc = self.get_xpath_text(xml_data, self.xpath_westbc_new, single_item=True)
-
-        east_bc = self.get_xpath_text(xml_data, self.xpath_eastbc, single_item=True)
-        if not east_bc:
-            east_bc = self.get_xpath_text(xml_data, self.xpath_eastbc_new, single_item=True)
-
-        north_bc = self.get_xpath_text(xml_data, self.xpath_northbc, single_item=True)
-        if not north_bc:
-            north_bc = self.get_xpath_text(xml_data, self.xpath_northbc_new, single_item=True)
-
-        south_bc = self.get_xpath_text(xml_data, self.xpath_southbc, single_item=True)
-        if not south_bc:
-            south_bc = self.get_xpath_text(xml_data, self.xpath_southbc_new, single_item=True)
-
-        spatial_dict = {}
-        min_x = None
-        min_y = None
-        max_x = None
-        max_y = None
-
-        if west_bc and east_bc and north_bc and south_bc:
-            if float(east_bc) > float(west_bc):
-                max_x = float(east_bc)
-                min_x = float(west_bc)
+        bounding_list = self.get_xpath_elements(xml_data, self.xpath_bounding)
+        if len(bounding_list) == 0:
+            bounding_list = self.get_xpath_elements(xml_data, self.xpath_bounding_new)
+        extents = []
+        for bounding_elm in bounding_list:
+            extent = self.get_bounding_extent(bounding_elm)
+            if extent is not None:
+                extents.append(extent)
+
+        # Parse the rings of every polygon in one batch, keeping track of which polygon each ring belongs to
+        ring_texts = []
+        ring_tags = []
+        ring_polygons = []
+        for polygon_number, polygon_elm in enumerate(self.get_xpath_elements(xml_data, self.xpath_polygon)):
+            for ring_tag, ring_text in self.get_polygon_rings(polygon_elm):
+                ring_texts.append(ring_text)
+                ring_tags.append(ring_tag)
+                ring_polygons.append(polygon_number)
+        polygon_rings = {}
+        for ring_number, ring in enumerate(parse_rings(ring_texts)):
+            polygon_number = ring_polygons[ring_number]
+            if polygon_number not in polygon_rings:
+                polygon_rings[polygon_number] = {"outer": None, "exclusions": [], "valid": True}
+            if ring is None:
+                # Leave out polygons with a ring which is not valid
+                polygon_rings[polygon_number]["valid"] = False
+            elif ring_tags[ring_number] == "dsgpolyo":
+                polygon_rings[polygon_number]["outer"] = ring
             else:
-                max_x = float(west_bc)
-                min_x = float(east_bc)
+                polygon_rings[polygon_number]["exclusions"].append(ring)
+        polygons = []
+        for polygon_number in sorted(polygon_rings):
+            polygon = polygon_rings[polygon_number]
+            if polygon["valid"] and polygon["outer"] is not None:
+                polygons.append((polygon["outer"], polygon["exclusions"]))
+                extents.append(get_ring_extent(polygon["outer"]))
 
-            if float(north_bc) > float(south_bc):
-                max_y = float(north_bc)
-                min_y = float(south_bc)
-            else:
-                max_y = float(south_bc)
-                min_y = float(north_bc)
-
-        if min_x is not None and max_x is not None and min_y is not None and max_y is not None:
-            spatial_dict = {"boundingBox": {"minX": min_x,
-                                            "maxX": max_x,
-                                            "minY": min_y,
-                                            "maxY": max_y}}
+        spatial_dict = {}
+        envelope = combine_extents(extents)
+        if envelope is not None:
+            west, east, south, north = envelope
+            spatial_dict = {"boundingBox": {"minX": west,
+                                            "maxX": east,
+                                            "minY": south,
+                                            "maxY": north}}
+            if self.include_footprint:
+                footprint = create_footprint(polygons, self.footprint_tolerance)
+                if footprint is not None:
+                    spatial_dict["footprint"] = footprint
 
         return spatial_dict
 
@@ -284,25 +460,16 @@ class FGDC2SB:
         :param element: An xml element with datetime information
         :return: A string with the datetime information
         """
-        caldate = self.get_xpath_sub_elements(root_element=element, single_item=True, element_name="caldate")
-        time = self.get_xpath_sub_elements(root_element=element, single_item=True, element_name="time")
-        full_datetime_string = ""
+        element_index = self.get_subtree_index(element)
+        caldate = self.get_xpath_sub_elements(root_element=element_index, single_item=True, element_name="caldate")
+        time = self.get_xpath_sub_elements(root_element=element_index, single_item=True, element_name="time")
+        date_string = None
+        time_string = None
         if caldate is not None:
-            str = caldate.text
-            caldate_tester = datetimeHandler(str)
-            valid_date, date_format = caldate_tester.test_date_string()
-            if valid_date == True:
-                date_handler = datetimeHandler(str)
-                formatted_date_string = date_handler.convert_date_format(date_format)
-                full_datetime_string += formatted_date_string
+            date_string = caldate.text
         if time is not None:
-            str = time.text
-            time_tester = datetimeHandler(str)
-            valid_time, time_format = time_tester.test_time_string()
-            if valid_time == True:
-                time_handler = datetimeHandler(str)
-                formatted_time_string = time_handler.convert_time_format(time_format)
-                full_datetime_string += formatted_time_string
+            time_string = time.text
+        full_datetime_string = normalize_datetime(date_string, time_string)
 
         return full_datetime_string
 
@@ -337,48 +504,26 @@ class FGDC2SB:
         :return: A list of dictionaries with start and end datetime information
         """
         range_dates = []
-        begin_datetime_string = ""
-        end_datetime_string = ""
-        begdate = self.get_xpath_sub_elements(root_element=element, single_item=True, element_name="begdate")
-        begtime = self.get_xpath_sub_elements(root_element=element, single_item=True, element_name="begtime")
-        enddate = self.get_xpath_sub_elements(root_element=element, single_item=True, element_name="enddate")
-        endtime = self.get_xpath_sub_elements(root_element=element, single_item=True, element_name="endtime")
-
+        element_index = self.get_subtree_index(element)
+        begdate = self.get_xpath_sub_elements(root_element=element_index, single_item=True, element_name="begdate")
+        begtime = self.get_xpath_sub_elements(root_element=element_index, single_item=True, element_name="begtime")
+        enddate = self.get_xpath_sub_elements(root_element=element_index, single_item=True, element_name="enddate")
+        endtime = self.get_xpath_sub_elements(root_element=element_index, single_item=True, element_name="endtime")
+
+        begdate_string = None
+        begtime_string = None
+        enddate_string = None
+        endtime_string = None
         if begdate is not None:
-            str = begdate.text
-            begdate_tester = datetimeHandler(str)
-            valid_date, date_format = begdate_tester.test_date_string()
-            if valid_date == True:
-                date_handler = datetimeHandler(str)
-                formatted_date_string = date_handler.convert_date_format(date_format)
-                begin_datetime_string += formatted_date_string
-
+            begdate_string = begdate.text
         if begtime is not None:
-            str = begtime.text
-            begtime_tester = datetimeHandler(str)
-            valid_time, time_format = begtime_tester.test_time_string()
-            if valid_time == True:
-                time_handler = datetimeHandler(str)
-                formatted_time_string = time_handler.convert_time_format(time_format)
-                begin_datetime_string += formatted_time_string
-
+            begtime_string = begtime.text
         if enddate is not None:
-            str = enddate.text
-            enddate_tester = datetimeHandler(str)
-            valid_date, date_format = enddate_tester.test_date_string()
-            if valid_date == True:
-                date_handler = datetimeHandler(str)
-                formatted_date_string = date_handler.convert_date_format(date_format)
-                end_datetime_string += formatted_date_string
-
-        if endtime:
-            str = endtime.text
-            endtime_tester = datetimeHandler(str)
-            valid_time, time_format = endtime_tester.test_time_string()
-            if valid_time == True:
-                time_handler = datetimeHandler(str)
-                formatted_time_string = time_handler.convert_time_format(time_format)
-                end_datetime_string += formatted_time_string
+            enddate_string = enddate.text
+        if endtime is not None:
+            endtime_string = endtime.text
+        begin_datetime_string = normalize_datetime(begdate_string, begtime_string)
+        end_datetime_string = normalize_datetime(enddate_string, endtime_string)
 
         if begin_datetime_string:
             date_dict = {
@@ -411,21 +556,9 @@ class FGDC2SB:
         dates = []
 
         if pubdate and pubdate != "Unpublished Material" and pubdate != "Unknown":
-            date_string = ""
-            pubdate_tester = datetimeHandler(pubdate)
-            valid_date, date_format = pubdate_tester.test_date_string()
-            if valid_date == True:
-                date_handler = datetimeHandler(pubdate)
-                formatted_date_string = date_handler.convert_date_format(date_format)
-                date_string += formatted_date_string
-            if pubtime and pubtime != "Unknown":
-                pubtime_tester = datetimeHandler(pubtime)
-                valid_time, time_format = pubtime_tester.test_time_string()
-                if valid_time == True:
-                    time_handler = datetimeHandler(pubtime)
-                    formatted_time_string = time_handler.convert_time_format(time_format)
-                    date_string += formatted_time_string
-
+            if pubtime == "Unknown":
+                pubtime = None
+            date_string = normalize_datetime(pubdate, pubtime)
             if date_string:
                 date_dict = {
                     "type": "Publication",
@@ -436,6 +569,46 @@ class FGDC2SB:
 
         return dates
 
+    def get_timeinfo_dates(self, timeinfo_element):
+        """
+        Collect the date and time elements of a timeinfo element in a single walk over it, in document order
+        Each sngdate (on its own or within mdattim) gives an Info date, and each rngdates gives a Start and an End date
+        :param timeinfo_element: The timeinfo xml element
+        :return: A list of lists with the date type, the date element and the time element (or None)
+        """
+        timeinfo_dates = []
+        single_date = None
+        begin_date = None
+        end_date = None
+        for element in timeinfo_element.iter("sngdate", "caldate", "time", "rngdates", "begdate", "begtime",
+                                             "enddate", "endtime"):
+            tag = element.tag
+            if tag == "sngdate":
+                single_date = ["Info", None, None]
+                timeinfo_dates.append(single_date)
+            elif tag == "rngdates":
+                begin_date = ["Start", None, None]
+                end_date = ["End", None, None]
+                timeinfo_dates.append(begin_date)
+                timeinfo_dates.append(end_date)
+            elif tag == "caldate":
+                if single_date is not None and single_date[1] is None:
+                    single_date[1] = element
+            elif tag == "time":
+                if single_date is not None and single_date[2] is None:
+                    single_date[2] = element
+            elif begin_date is not None:
+                if tag == "begdate" and begin_date[1] is None:
+                    begin_date[1] = element
+                elif tag == "begtime" and begin_date[2] is None:
+                    begin_date[2] = element
+                elif tag == "enddate" and end_date[1] is None:
+                    end_date[1] = element
+                elif tag == "endtime" and end_date[2] is None:
+                    end_date[2] = element
+
+        return timeinfo_dates
+
     def get_time_period_info(self, xml_data):
         """
         Get info for Time Period related to the xml document: http://www.fgdc.gov/metadata/csdgm/09.html
@@ -443,36 +616,23 @@ class FGDC2SB:
         :return: A list which includes sets of time period info
         """
         time_perd = self.get_xpath_elements(xml_data, self.xpath_timeperiod)
+        timeinfo_dates = []
+        for time_perd_elm in time_perd:
+            timeinfo_dates.extend(self.get_timeinfo_dates(time_perd_elm))
+
+        # Normalize every collected date and time at once
+        datetime_pairs = []
+        for date_type, date_elm, time_elm in timeinfo_dates:
+            datetime_pairs.append((date_elm.text if date_elm is not None else None,
+                                   time_elm.text if time_elm is not None else None))
+        datetime_strings = normalize_datetimes(datetime_pairs)
+
         time_periods = []
-        if len(time_perd) > 0:
-            for time_perd_elm in time_perd:
-                sngdates = self.get_xpath_sub_elements(root_element=time_perd_elm, single_item=False, element_name="sngdate")
-                mdattims = self.get_xpath_sub_elements(root_element=time_perd_elm, single_item=False, element_name="mdattim")
-                rngdates = self.get_xpath_sub_elements(root_element=time_perd_elm, single_item=False, element_name="rngdates")
-                if len(sngdates) > 0:
-                    for sngdate_elm in sngdates:
-                        parent_elm = self.get_xpath_parent_elements(sngdate_elm, 1)
-                        if parent_elm.tag != "mdattim":
-                            single_date = self.handle_single_datetime(sngdate_elm)
-                            if single_date:
-                                date_dict = {
-                                    "type": "Info",
-                                    "dateString": single_date,
-                                    "label": "Time Period"
-                                }
-                                time_periods.append(date_dict)
-                if len(mdattims) > 0:
-                    for mdattim_elm in mdattims:
-                        multi_dates = self.handle_multi_datetime(mdattim_elm, "Time Period")
-                        if len(multi_dates) > 0:
-                            for md in multi_dates:
-                                time_periods.append(md)
-                if len(rngdates) > 0:
-                    for rngdates_elm in rngdates:
-                        range_dates = self.handle_range_datetime(rngdates_elm)
-                        if len(range_dates) > 0:
-                            for rd in range_dates:
-                                time_periods.append(rd)
+        labels = {"Info": "Time Period", "Start": "", "End": ""}
+        for timeinfo_date, datetime_string in zip(timeinfo_dates, datetime_strings):
+            if datetime_string:
+                time_periods.append({"type": timeinfo_date[0], "dateString": datetime_string,
+                                     "label": labels[timeinfo_date[0]]})
 
         return time_periods
 
@@ -587,16 +747,17 @@ class FGDC2SB:
     def generate_address_info(self, address_element):
         """
         Get attribute info for an address
-        :param address_element: An xml element with address info
+        :param address_element: An xml element with address info, or a subtreeIndex of it
         :return: A dictionary with address info and a string representing the address type
         """
         address_dict = {}
         address_type = "streetAddress"
-        addrtype = self.get_xpath_sub_elements(root_element=address_element, single_item=True, element_name="addrtype")
+        address_index = self.get_subtree_index(address_element)
+        addrtype = self.get_xpath_sub_elements(root_element=address_index, single_item=True, element_name="addrtype")
         if addrtype is not None and self.mail_regex_pattern.search(addrtype.text):
             address_type = "mailAddress"
         address_line_text = []
-        address_lines = self.get_xpath_sub_elements(root_element=address_element, single_item=False, element_name="address")
+        address_lines = self.get_xpath_sub_elements(root_element=address_index, single_item=False, element_name="address")
         if len(address_lines) > 0:
             for address_line in address_lines:
                 address_line_text.append(address_line.text)
@@ -605,16 +766,16 @@ class FGDC2SB:
                 address_dict["line2"] = address_line_text[1]
             else:
                 address_dict["line1"] = "\n".join(address_line_text)
-        city = self.get_xpath_sub_elements(root_element=address_element, single_item=True, element_name="city")
+        city = self.get_xpath_sub_elements(root_element=address_index, single_item=True, element_name="city")
         if city is not None:
             address_dict["city"] = city.text
-        state = self.get_xpath_sub_elements(root_element=address_element, single_item=True, element_name="state")
+        state = self.get_xpath_sub_elements(root_element=address_index, single_item=True, element_name="state")
         if state is not None:
             address_dict["state"] = state.text
-        postal = self.get_xpath_sub_elements(root_element=address_element, single_item=True, element_name="postal")
+        postal = self.get_xpath_sub_elements(root_element=address_index, single_item=True, element_name="postal")
         if postal is not None:
             address_dict["zip"] = postal.text
-        country = self.get_xpath_sub_elements(root_element=address_element, single_item=True, element_name="country")
+        country = self.get_xpath_sub_elements(root_element=address_index, single_item=True, element_name="country")
         if country is not None:
             address_dict["country"] = country.text
 
@@ -623,19 +784,20 @@ class FGDC2SB:
     def generate_primary_location_info(self, location_element):
         """
         Create a dictionary with attribute info for a primary location
-        :param location_element: The xml element with info about the primary location
+        :param location_element: The xml element with info about the primary location, or a subtreeIndex of it
         :return: a dictionary with info about the primary location
         """
         primary_location_dict = {}
-        cntaddr = self.get_xpath_sub_elements(root_element=location_element, single_item=True, element_name="cntaddr")
+        location_index = self.get_subtree_index(location_element)
+        cntaddr = self.get_xpath_sub_elements(root_element=location_index, single_item=True, element_name="cntaddr")
         if cntaddr is not None:
             address_dict, address_type = self.generate_address_info(cntaddr)
             if len(address_dict) > 0:
                 primary_location_dict[address_type] = address_dict
-        cntvoice = self.get_xpath_sub_elements(root_element=location_element, single_item=True, element_name="cntvoice")
+        cntvoice = self.get_xpath_sub_elements(root_element=location_index, single_item=True, element_name="cntvoice")
         if cntvoice is not None:
             primary_location_dict["officePhone"] = cntvoice.text
-        cntfax = self.get_xpath_sub_elements(root_element=location_element, single_item=True, element_name="cntfax")
+        cntfax = self.get_xpath_sub_elements(root_element=location_index, single_item=True, element_name="cntfax")
         if cntfax is not None:
             primary_location_dict["faxPhone"] = cntfax.text
         ordered_primary_location_dict = self.reorder_dict_keys(primary_location_dict, self.primary_location_order)
@@ -652,50 +814,49 @@ class FGDC2SB:
         contact = {}
         contact["type"] = contact_type
         if cntinfo is not None:
-            cntperp = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="cntperp")
+            cntinfo_index = self.get_subtree_index(cntinfo)
+            cntperp = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="cntperp")
             if cntperp is not None:
                 contact["contactType"] = "person"
-                cntper = self.get_xpath_sub_elements(root_element=cntperp, single_item=True, element_name="cntper")
+                cntperp_index = self.get_subtree_index(cntperp)
+                cntper = self.get_xpath_sub_elements(root_element=cntperp_index, single_item=True, element_name="cntper")
                 if cntper is not None:
                     contact["name"] = cntper.text
-                cntorg = self.get_xpath_sub_elements(root_element=cntperp, single_item=True, element_name="cntorg")
+                cntorg = self.get_xpath_sub_elements(root_element=cntperp_index, single_item=True, element_name="cntorg")
                 if cntorg is not None:
                     organization = {}
                     organization["displayText"] = cntorg.text
                     contact["organization"] = organization
             else:
-                cntorgp = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="cntorgp")
+                cntorgp = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="cntorgp")
                 if cntorgp is not None:
                     contact["contactType"] = "organization"
-                    cntorg = self.get_xpath_sub_elements(root_element=cntorgp, single_item=True, element_name= "cntorg")
-                    cntper = self.get_xpath_sub_elements(root_element=cntorgp, single_item=True, element_name= "cntper")
+                    cntorgp_index = self.get_subtree_index(cntorgp)
+                    cntorg = self.get_xpath_sub_elements(root_element=cntorgp_index, single_item=True, element_name= "cntorg")
+                    cntper = self.get_xpath_sub_elements(root_element=cntorgp_index, single_item=True, element_name= "cntper")
                     if cntorg is not None:
                         contact["name"] = cntorg.text
                     if cntper is not None:
                         contact["organizationsPerson"] = cntper.text
-            cntpos = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="cntpos")
+            cntpos = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="cntpos")
             if cntpos is not None:
                 contact["jobTitle"] = cntpos.text
-            primary_location_dict = self.generate_primary_location_info(cntinfo)
+            primary_location_dict = self.generate_primary_location_info(cntinfo_index)
             if len(primary_location_dict) > 0:
                 contact["primaryLocation"] = primary_location_dict
-            email = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="cntemail")
+            email = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="cntemail")
             if email is not None:
                 #Verify that email address value is a valid email address
-                is_valid = True
-                try:
-                    validate_email(email.text).email
-                except EmailNotValidError:
-                    is_valid = False
+                is_valid = is_valid_email(email.text, self.check_email_deliverability)
                 if is_valid == True:
                     contact["email"] = email.text
-            cnttdd = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="cnttdd")
+            cnttdd = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="cnttdd")
             if cnttdd is not None:
                 contact["ttyPhone"] = cnttdd.text
-            hours = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="hours")
+            hours = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="hours")
             if hours is not None:
                 contact["hours"] = hours.text
-            cntinst = self.get_xpath_sub_elements(root_element=cntinfo, single_item=True, element_name="cntinst")
+            cntinst = self.get_xpath_sub_elements(root_element=cntinfo_index, single_item=True, element_name="cntinst")
             if cntinst is not None:
                 contact["instructions"] = cntinst.text
         ordered_contact = self.reorder_dict_keys(contact, self.contact_order)
@@ -723,40 +884,62 @@ class FGDC2SB:
             contacts = self.get_xpath_elements(xml_data, contact_xpaths[xpath])
             if len(contacts) > 0:
                 for contact in contacts:
-                    party = self.load_party(xpath, contact)
-                    if party:
+                    if self.party_cache is None:
+                        contact_parties = self.load_contact_parties(xpath, contact)
+                    else:
+                        fingerprint = self.party_cache.get_fingerprint(xpath, contact, self.check_email_deliverability,
+                                                                       type(self))
+                        contact_parties = self.party_cache.get(fingerprint)
+                        if contact_parties is None:
+                            contact_parties = self.load_contact_parties(xpath, contact)
+                            self.party_cache.put(fingerprint, contact_parties)
+                    for party in contact_parties:
                         parties.append(party)
-                        if party["contactType"] == "organization" and "organizationsPerson" in party:
-                            orgPerson = {}
-                            organization = {}
-                            orgPerson["contactType"] = "person"
-                            orgPerson["type"] = party["type"]
-                            orgPerson["name"] = party["organizationsPerson"]
-                            orgPerson["organization"] = organization
-                            if "name" in party:
-                                organization["displayText"] = party["name"]
-                            if "primaryLocation" in party:
-                                orgPerson["primaryLocation"] = party["primaryLocation"]
-                            if "email" in party:
-                                orgPerson["email"] = party["email"]
-                            if "jobTitle" in party:
-                                orgPerson["jobTitle"] = party["jobTitle"]
-                            ordered_orgPerson = self.reorder_dict_keys(orgPerson, self.contact_order)
-                            parties.append(ordered_orgPerson)
-                        if party["contactType"] == "person" and "organization" in party:
-                            personsOrg = {}
-                            personsOrg["contactType"] = "organization"
-                            personsOrg["type"] = party["type"]
-                            if "organization" in party:
-                                personsOrg["name"] = (party["organization"])["displayText"]
-                            if "primaryLocation" in party:
-                                personsOrg["primaryLocation"] = party["primaryLocation"]
-                            if "email" in party:
-                                personsOrg["email"] = party["email"]
-                            if "jobTitle" in party:
-                                personsOrg["jobTitle"] = party["jobTitle"]
-                            ordered_personsOrg = self.reorder_dict_keys(personsOrg, self.contact_order)
-                            parties.append(ordered_personsOrg)
+
+        return parties
+
+    def load_contact_parties(self, contact_type, cntinfo):
+        """
+        Get the contact entries for one contact: the contact itself and a person or organization copy of it
+        :param contact_type: The type of contact
+        :param cntinfo: The xml element with info about a contact
+        :return: A list of dictionaries with the data for the contact
+        """
+        parties = []
+        party = self.load_party(contact_type, cntinfo)
+        if party:
+            parties.append(party)
+            if party["contactType"] == "organization" and "organizationsPerson" in party:
+                orgPerson = {}
+                organization = {}
+                orgPerson["contactType"] = "person"
+                orgPerson["type"] = party["type"]
+                orgPerson["name"] = party["organizationsPerson"]
+                orgPerson["organization"] = organization
+                if "name" in party:
+                    organization["displayText"] = party["name"]
+                if "primaryLocation" in party:
+                    orgPerson["primaryLocation"] = party["primaryLocation"]
+                if "email" in party:
+                    orgPerson["email"] = party["email"]
+                if "jobTitle" in party:
+                    orgPerson["jobTitle"] = party["jobTitle"]
+                ordered_orgPerson = self.reorder_dict_keys(orgPerson, self.contact_order)
+                parties.append(ordered_orgPerson)
+            if party["contactType"] == "person" and "organization" in party:
+                personsOrg = {}
+                personsOrg["contactType"] = "organization"
+                personsOrg["type"] = party["type"]
+                if "organization" in party:
+                    personsOrg["name"] = (party["organization"])["displayText"]
+                if "primaryLocation" in party:
+                    personsOrg["primaryLocation"] = party["primaryLocation"]
+                if "email" in party:
+                    personsOrg["email"] = party["email"]
+                if "jobTitle" in party:
+                    personsOrg["jobTitle"] = party["jobTitle"]
+                ordered_personsOrg = self.reorder_dict_keys(personsOrg, self.contact_order)
+                parties.append(ordered_personsOrg)
 
         return parties
 
@@ -839,30 +1022,55 @@ class FGDC2SB:
 
         return contact_list
 
-    def get_network_resource_info(self, xml_data, network_res_elm):
+    def get_distribution_index(self, xml_data):
+        """
+        Pairs each network resource with the format name and transfer size of its own digital form
+        in a single pass over the digital forms
+        :param xml_data: The parsed xml file object
+        :return: A dictionary keyed by networkr element with the format name and transfer size in bytes
+        """
+        import decimal
+
+        distribution_index = {}
+        for digform_elm in self.get_xpath_elements(xml_data, self.xpath_digital_form):
+            digform_index = self.get_subtree_index(digform_elm)
+            digform_info = {"formname": None, "has_formname": False, "transfer_size": 0}
+            formname_list = self.get_xpath_sub_elements(root_element=digform_index, single_item=False, element_name="formname")
+            if len(formname_list) > 0:
+                digform_info["has_formname"] = True
+                digform_info["formname"] = formname_list[-1].text
+            transize_elm = self.get_xpath_sub_elements(root_element=digform_index, single_item=True, element_name="transize")
+            if transize_elm is not None and transize_elm.text:
+                try:
+                    digform_transize = decimal.Decimal(transize_elm.text.strip())
+                    digform_info["transfer_size"] = int(digform_transize * 1048576)
+                except (decimal.InvalidOperation, ValueError, OverflowError):
+                    digform_info["transfer_size"] = 0
+            # Digital forms are visited in document order, so a networkr gets its nearest digform
+            for network_res_elm in self.get_xpath_sub_elements(root_element=digform_index, single_item=False, element_name="networkr"):
+                distribution_index[network_res_elm] = digform_info
+
+        return distribution_index
+
+    def get_network_resource_info(self, xml_data, network_res_elm, distribution_index=None):
         """
         Gets the network resource web link data
         :param xml_data: The parsed xml file object
         :param network_res_elm: The xml element with the network resource data
-        :return: A dictionary with the network resource data
+        :param distribution_index: Optional dictionary from get_distribution_index, to reuse for every network resource
+        :return: A dictionary with the network resource data, with the title and length from its own digital form
         """
         network_link_handler = webLinkHandler(network_res_elm.text)
         network_link = network_link_handler.create_web_link()
         if len(network_link) > 0:
-            digform_elm = self.get_xpath_parent_elements(network_res_elm, 5)
-            digform_list = self.get_xpath_sub_elements(root_element=digform_elm, single_item=False, element_name="formname")
-            try:
-                digform_transize_str = self.get_xpath_text(xml_data, self.xpath_transfersize, single_item=True)
-                digform_transize = decimal.Decimal(digform_transize_str)
-                transfer_size = int(digform_transize * 1048576)
-            except:
-                transfer_size = 0
-
-            for dl in digform_list:
-                text = dl.text
-                network_link["title"] = text
-                if transfer_size != 0:
-                    network_link["length"] = transfer_size
+            if distribution_index is None:
+                distribution_index = self.get_distribution_index(xml_data)
+            digform_info = distribution_index.get(network_res_elm)
+            if digform_info is not None:
+                if digform_info["has_formname"]:
+                    network_link["title"] = digform_info["formname"]
+                if digform_info["transfer_size"] != 0:
+                    network_link["length"] = digform_info["transfer_size"]
 
         return network_link
 
@@ -909,8 +1117,9 @@ class FGDC2SB:
         browse_image_list = self.get_xpath_elements(xml_data, self.xpath_browse_image)
         if len(browse_image_list) > 0:
             for browse_elm in browse_image_list:
-                browsen_elm = self.get_xpath_sub_elements(root_element=browse_elm, single_item=True, element_name="browsen")
-                browsed_elm = self.get_xpath_sub_elements(root_element=browse_elm, single_item=True, element_name="browsed")
+                browse_index = self.get_subtree_index(browse_elm)
+                browsen_elm = self.get_xpath_sub_elements(root_element=browse_index, single_item=True, element_name="browsen")
+                browsed_elm = self.get_xpath_sub_elements(root_element=browse_index, single_item=True, element_name="browsed")
                 browse_link = {}
                 if browsen_elm is not None:
                     browse_link_handler = webLinkHandler(browsen_elm.text)
@@ -923,8 +1132,10 @@ class FGDC2SB:
                     web_links.append(ordered_browse_link)
 
         network_link_list = self.get_xpath_elements(xml_data, self.xpath_network_resource)
+        if len(network_link_list) > 0:
+            distribution_index = self.get_distribution_index(xml_data)
         for network_resource_elm in network_link_list:
-            network_link = self.get_network_resource_info(xml_data, network_resource_elm)
+            network_link = self.get_network_resource_info(xml_data, network_resource_elm, distribution_index)
             if len(network_link) > 0:
                 ordered_network_link = self.reorder_dict_keys(network_link, self.web_link_order)
                 web_links.append(ordered_network_link)
@@ -942,6 +1153,8 @@ class FGDC2SB:
         this_tag = tag_element.text
         sb_tag = {}
         if this_tag and len(this_tag) <= 80:
+            if self.tag_vocabulary is not None:
+                return self.tag_vocabulary.get_tag("Theme", kt_text, this_tag)
             sb_tag["type"] = "Theme"
             if kt_text:
                 sb_tag["scheme"] = kt_text
@@ -960,8 +1173,9 @@ class FGDC2SB:
         theme_list = self.get_xpath_elements(xml_data, self.xpath_themekey)
         for theme_elm in theme_list:
             themekt = ""
-            themekt_el = self.get_xpath_sub_elements(root_element=theme_elm, single_item=True, element_name="themekt")
-            themekey_elms = self.get_xpath_sub_elements(root_element=theme_elm, single_item=False, element_name="themekey")
+            theme_index = self.get_subtree_index(theme_elm)
+            themekt_el = self.get_xpath_sub_elements(root_element=theme_index, single_item=True, element_name="themekt")
+            themekey_elms = self.get_xpath_sub_elements(root_element=theme_index, single_item=False, element_name="themekey")
             if themekt_el is not None:
                 themekt = themekt_el.text
             for te in themekey_elms:
@@ -972,8 +1186,9 @@ class FGDC2SB:
         place_list = self.get_xpath_elements(xml_data, self.xpath_placekey)
         for place_elm in place_list:
             placekt = ""
-            placekt_el = self.get_xpath_sub_elements(root_element=place_elm, single_item=True, element_name="placekt")
-            placekey_elms = self.get_xpath_sub_elements(root_element=place_elm, single_item=False, element_name="placekey")
+            place_index = self.get_subtree_index(place_elm)
+            placekt_el = self.get_xpath_sub_elements(root_element=place_index, single_item=True, element_name="placekt")
+            placekey_elms = self.get_xpath_sub_elements(root_element=place_index, single_item=False, element_name="placekey")
             if placekt_el is not None:
                 placekt = placekt_el.text
             for pe in placekey_elms:
@@ -983,22 +1198,13 @@ class FGDC2SB:
 
         return tag_list
 
-    def create_item(self, parent_id=None, source_url=None):
+    def get_parent_id(self, xml_data, parent_id=None):
         """
-        Generates a json object for the input xml data in sbjson form and exports it
-        :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
-        :param source_url: Optional parameter with the URL for original source
+        Gets the parent id from the crossref container (larger work citation) online links
+        :param xml_data: The parsed xml file object
+        :param parent_id: Optional parent id given by the caller, which takes precedence
+        :return: The parent id, and a list of the larger work online links which are not a parent item
         """
-        # Check if file is xml
-        is_xml_file = self.check_file_extension(self.input_file_name)
-        if is_xml_file == False:
-            raise Exception("Input file is not an xml file")
-
-        # Parse the xml file
-        xml_bytes = BytesIO(self.input_file)
-        xml_data = etree.parse(xml_bytes)
-
-        # Get parent id from crossref container
         parent_id_els = self.get_xpath_text(xml_data, self.xpath_parentid)
         non_parent_online_links = []
 
@@ -1017,63 +1223,327 @@ class FGDC2SB:
                         # Add Element to list of onlink link elements processed later
                         non_parent_online_links.append(parent_online_links_elm)
 
+        return parent_id, non_parent_online_links
+
+    def get_walker_paths(self):
+        """
+        Gets the walker_xpaths split up for the document walker, splitting them up the first time they are used
+        :return: A walkerPaths
+        """
+        walker_key = tuple(self.walker_xpaths)
+        walker_paths = self.walker_paths.get(walker_key)
+        if walker_paths is None:
+            walker_paths = walkerPaths(self.walker_xpaths)
+            self.walker_paths[walker_key] = walker_paths
+
+        return walker_paths
+
+    def get_streaming_parser(self):
+        """
+        Sets up a streaming parser which keeps the subtrees of the walker_xpaths, so the document walker
+        finds the same elements as it does in the fully parsed document
+        :return: A streamingParser
+        """
+        walker_paths = self.get_walker_paths()
+        keep_paths = walker_paths.relative_paths - set(self.streaming_existence_xpaths)
+
+        return streamingParser(keep_paths, self.streaming_existence_xpaths, self.parser_pool,
+                               walker_paths.descendant_tags)
+
+    def parse_xml(self, streaming=False, input_xml_file=None):
+        """
+        Parse the input xml file and collect the elements for every xml path in a single walk
+        :param streaming: Optional boolean for whether to use the streaming parser
+        :param input_xml_file: Optional xml file to parse instead of the input xml file of the converter
+        :return: The walked xml file object
+        """
+        if input_xml_file is None:
+            input_xml_file = self.input_file
+        # lxml is imported by the parsers on first use, so importing the converter stays fast for jobs
+        # which only hit the cache
+        xml_source = open_xml_source(input_xml_file)
+        if streaming == True:
+            stream_parser = self.get_streaming_parser()
+            xml_tree = stream_parser.parse(xml_source)
+        else:
+            xml_tree = self.parser_pool.parse(xml_source)
+
+        return documentWalker(xml_tree, self.get_walker_paths())
+
+    def run_stage(self, tracer, stage_name, function, *args):
+        """
+        Run a stage of create_item, recording it with the tracer if there is one
+        :param tracer: Optional conversionTracer
+        :param stage_name: The name of the stage
+        :param function: The function which runs the stage
+        :param args: The arguments for the function
+        :return: The output of the stage
+        """
+        if tracer is None:
+            return function(*args)
+
+        return tracer.run_stage(stage_name, function, *args)
+
+    def get_section(self, item_state, section_name):
+        """
+        Run a section extractor for an item the first time one of its fields needs it
+        :param item_state: A dictionary with the walked xml file object, the create_item options and the
+        outputs of the sections which have already been run
+        :param section_name: The name of the section
+        :return: The output of the section extractor
+        """
+        sections = item_state["sections"]
+        if section_name in sections:
+            return sections[section_name]
+
+        xml_data = item_state["xml_data"]
+        tracer = item_state["tracer"]
+        if section_name == "parent":
+            section = self.run_stage(tracer, "get_parent_id", self.get_parent_id, xml_data, item_state["parent_id"])
+        elif section_name == "title":
+            section = self.get_xpath_text(xml_data, self.xpath_title, single_item=True)
+        elif section_name == "description":
+            section = self.run_stage(tracer, "get_description", self.get_description, xml_data)
+        elif section_name == "purpose":
+            section = self.get_xpath_text(xml_data, self.xpath_purpose, single_item=True)
+        elif section_name == "maintenance_freq":
+            section = self.get_xpath_text(xml_data, self.xpath_main_update_freq, single_item=True)
+        elif section_name == "identifiers":
+            section = self.run_stage(tracer, "get_identifiers", self.get_identifiers, xml_data)
+        elif section_name == "spatial":
+            section = self.run_stage(tracer, "create_bounding_box", self.create_bounding_box, xml_data)
+        elif section_name == "citation_facets":
+            section = self.run_stage(tracer, "create_citation_facets", self.create_citation_facets, xml_data)
+        elif section_name == "citation_string":
+            citation_facet_handler = citationHandler(facet_list=self.get_section(item_state, "citation_facets"))
+            section = self.run_stage(tracer, "set_citation_string", citation_facet_handler.set_citation_string)
+        elif section_name == "web_links":
+            parent_id, non_parent_online_links = self.get_section(item_state, "parent")
+            section = self.run_stage(tracer, "generate_web_links", self.generate_web_links, xml_data,
+                                     non_parent_online_links, item_state["source_url"])
+        elif section_name == "tags":
+            section = self.run_stage(tracer, "create_tags", self.create_tags, xml_data)
+        elif section_name == "contacts":
+            section = self.run_stage(tracer, "generate_contact_info", self.generate_contact_info, xml_data)
+        elif section_name == "publication_dates":
+            section = self.run_stage(tracer, "get_publication_date_info", self.get_publication_date_info, xml_data)
+        elif section_name == "time_periods":
+            section = self.run_stage(tracer, "get_time_period_info", self.get_time_period_info, xml_data)
+        else:
+            raise ValueError("Unknown section: %s" % section_name)
+        sections[section_name] = section
+
+        return section
+
+    def get_item_field(self, item_state, field_name):
+        """
+        Gets the value of one field of an sbjson item, running only the section extractors the field needs
+        :param item_state: A dictionary with the walked xml file object, the create_item options and the
+        outputs of the sections which have already been run
+        :param field_name: The name of the sbjson item field
+        :return: The value of the field, or None if the xml file has no data for the field
+        """
+        if field_name == "identifiers":
+            identifiers = self.get_section(item_state, "identifiers")
+            if len(identifiers) > 0:
+                return identifiers
+        elif field_name == "title":
+            title = self.get_section(item_state, "title")
+            if title:
+                return title
+        elif field_name == "summary":
+            description, summary = self.get_section(item_state, "description")
+            if summary:
+                return summary
+        elif field_name == "body":
+            description, summary = self.get_section(item_state, "description")
+            if description:
+                return description
+        elif field_name == "citation":
+            citation_facets = self.get_section(item_state, "citation_facets")
+            if citation_facets:
+                return self.get_section(item_state, "citation_string")
+        elif field_name == "purpose":
+            purpose = self.get_section(item_state, "purpose")
+            if purpose:
+                return purpose
+        elif field_name == "maintenanceUpdateFrequency":
+            maintenance_freq = self.get_section(item_state, "maintenance_freq")
+            if maintenance_freq:
+                return maintenance_freq
+        elif field_name == "parentId":
+            parent_id, non_parent_online_links = self.get_section(item_state, "parent")
+            return parent_id
+        elif field_name == "contacts":
+            contact_list = self.get_section(item_state, "contacts")
+            if len(contact_list) > 0:
+                return contact_list
+        elif field_name == "webLinks":
+            web_links = self.get_section(item_state, "web_links")
+            if len(web_links) > 0:
+                return web_links
+        elif field_name == "tags":
+            tag_list = self.get_section(item_state, "tags")
+            if len(tag_list) > 0:
+                return tag_list
+        elif field_name == "dates":
+            dates = self.get_section(item_state, "publication_dates") + self.get_section(item_state, "time_periods")
+            if len(dates) > 0:
+                return dates
+        elif field_name == "spatial":
+            spatial_dict = self.get_section(item_state, "spatial")
+            if len(spatial_dict) > 0:
+                return spatial_dict
+        else:
+            raise ValueError("Unknown item field: %s" % field_name)
+
+        return None
+
+    def start_item(self, parent_id=None, source_url=None, streaming=False, tracer=None, fields=None,
+                   input_xml_file=None, input_file_name=None, keep_parsed=False):
+        """
+        Check and parse the input xml file and set up the state used to create the fields of an item
+        :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+        :param source_url: Optional parameter with the URL for original source
+        :param streaming: Optional boolean for whether to use the streaming parser
+        :param tracer: Optional conversionTracer
+        :param fields: Optional list of the sbjson item fields to create
+        :param input_xml_file: Optional xml file to convert instead of the input xml file of the converter
+        :param input_file_name: Optional name of input_xml_file, found from its path or file object if not given
+        :param keep_parsed: Optional boolean for whether to keep the parsed document, and to reuse it when
+        the same bytes object is given again. Paths, files and buffers can change between calls, so they
+        are always parsed again
+        :return: The item state dictionary and the list of fields to create
+        """
+        if fields is None:
+            fields = self.item_fields
+        for field_name in fields:
+            if field_name not in self.item_fields:
+                raise ValueError("Unknown item field: %s" % field_name)
+
+        if input_xml_file is None:
+            input_xml_file = self.input_file
+            input_file_name = self.input_file_name
+        elif input_file_name is None:
+            input_file_name = get_source_name(input_xml_file)
+        if input_xml_file is None:
+            raise ValueError("No input xml file to convert")
+
+        # Check if file is xml. In memory documents (bytes, buffers, files without a name) have no file name to check
+        if input_file_name is not None and self.check_file_extension(input_file_name) == False:
+            raise Exception("Input file is not an xml file")
+
+        if tracer is not None:
+            tracer.start_record(input_file_name)
+
+        # Parse the xml file and collect the elements for every xml path in a single walk
+        xml_data = None
+        # Only bytes can not change after they are parsed, so only bytes are kept and reused
+        keep_parsed = keep_parsed and isinstance(input_xml_file, bytes)
+        parsed_document = getattr(self.thread_state, "parsed_document", None)
+        if keep_parsed and parsed_document is not None:
+            parsed_xml_file, parsed_streaming, parsed_xml_data = parsed_document
+            if parsed_xml_file is input_xml_file and parsed_streaming == streaming:
+                xml_data = parsed_xml_data
+        if xml_data is None:
+            # Release the document kept by an earlier call, so it is not held until the next one
+            self.thread_state.parsed_document = None
+            xml_data = self.run_stage(tracer, "parse_xml", self.parse_xml, streaming, input_xml_file)
+            if keep_parsed:
+                self.thread_state.parsed_document = (input_xml_file, streaming, xml_data)
+
+        # Kept with the item rather than on the converter, so conversions in other threads do not change it
+        browse_category_list = []
         ea_els = self.get_xpath_text(xml_data, self.xpath_eainfo)
         if len(ea_els) > 0:
-            self.browse_category_list = []
-            self.browse_category_list.append("data")
-
-        title = self.get_xpath_text(xml_data, self.xpath_title, single_item=True)
-        description, summary = self.get_description(xml_data)
-        purpose = self.get_xpath_text(xml_data, self.xpath_purpose, single_item=True)
-        maintenance_freq = self.get_xpath_text(xml_data, self.xpath_main_update_freq, single_item=True)
-        identifiers = self.get_identifiers(xml_data)
-        spatial_dict = self.create_bounding_box(xml_data)
-        citation_facets = self.create_citation_facets(xml_data)
-        web_links = self.generate_web_links(xml_data, non_parent_online_links, source_url)
-        tag_list = self.create_tags(xml_data)
-        contact_list = self.generate_contact_info(xml_data)
-        dates = self.get_publication_date_info(xml_data)
-        time_periods = self.get_time_period_info(xml_data)
-        for tp in time_periods:
-            dates.append(tp)
-
-        citation_facet_handler = citationHandler(facet_list=citation_facets)
-        citation_str = citation_facet_handler.set_citation_string()
+            browse_category_list.append("data")
+
+        item_state = {
+            "xml_data": xml_data,
+            "parent_id": parent_id,
+            "source_url": source_url,
+            "tracer": tracer,
+            "browse_category_list": browse_category_list,
+            "sections": {}
+        }
 
+        return item_state, fields
+
+    def build_item(self, item_state, fields):
+        """
+        Create the fields of an sbjson item from the item state
+        :param item_state: The item state dictionary from start_item
+        :param fields: The list of sbjson item fields to create
+        :return: A dictionary with the sbjson item
+        """
         # Generate a dictionary called item_data with all data generated from the xml file
         item_data = {}
+        for field_name in self.item_fields:
+            if field_name in fields:
+                field_value = self.get_item_field(item_state, field_name)
+                if field_value is not None:
+                    item_data[field_name] = field_value
 
-        if len(identifiers) > 0:
-            item_data["identifiers"] = identifiers
-        if title:
-            item_data["title"] = title
-        if summary:
-            item_data["summary"] = summary
-        if description:
-            item_data["body"] = description
-        if citation_facets:
-            item_data["citation"] = citation_str
-        if purpose:
-            item_data["purpose"] = purpose
-        if maintenance_freq:
-            item_data["maintenanceUpdateFrequency"] = maintenance_freq
-        if parent_id is not None:
-            item_data["parentId"] = parent_id
-        if len(contact_list) > 0:
-            item_data["contacts"] = contact_list
-        if len(web_links) > 0:
-            item_data["webLinks"] = web_links
-        if len(tag_list) > 0:
-            item_data["tags"] = tag_list
-        if len(dates) > 0:
-            item_data["dates"] = dates
-        if len(spatial_dict) > 0:
-            item_data["spatial"] = spatial_dict
-
-        # Convert item_data dictionary to json and create a new json file
-        #item_json = json.dumps(item_data)
+        if item_state["tracer"] is not None:
+            item_state["tracer"].end_record()
 
         return item_data
 
+    def create_item(self, parent_id=None, source_url=None, streaming=False, tracer=None, fields=None):
+        """
+        Generates a json object for the input xml data in sbjson form and exports it
+        :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+        :param source_url: Optional parameter with the URL for original source
+        :param streaming: Optional boolean for whether to parse with iterparse and clear the sections
+        of the xml file which are not mapped (e.g. eainfo) as they are read. Use for very large xml files
+        :param tracer: Optional conversionTracer from Timing_Utils which records the wall time, element count
+        and output size of each stage
+        :param fields: Optional list of the sbjson item fields to create (see self.item_fields), e.g.
+        ["title", "spatial", "tags"]. The section extractors for the other fields are not run
+        """
+        item_state, fields = self.start_item(parent_id, source_url, streaming, tracer, fields)
 
+        return self.build_item(item_state, fields)
+
+    def convert(self, input_xml_file, parent_id=None, source_url=None, input_file_name=None, streaming=False,
+                tracer=None, fields=None, keep_parsed=False):
+        """
+        Convert an xml file with a converter which is reused for many documents
+        :param input_xml_file: The xml file to convert as bytes, a file system path, an open binary file
+        object or a memory-mapped buffer
+        :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+        :param source_url: Optional parameter with the URL for original source
+        :param input_file_name: Optional name of the xml file, found from its path or file object if not given.
+        A name without an .xml extension is rejected. Documents without a name (bytes, buffers) are not checked
+        :param streaming: Optional boolean for whether to use the streaming parser
+        :param tracer: Optional conversionTracer
+        :param fields: Optional list of the sbjson item fields to create
+        :param keep_parsed: Optional boolean for whether to keep the parsed document, so converting the same
+        bytes object again (e.g. with another parent_id or source_url) does not parse it again.
+        Paths, files and buffers are always parsed again, since they can change between calls
+        :return: A dictionary with the sbjson item
+        """
+        item_state, fields = self.start_item(parent_id, source_url, streaming, tracer, fields, input_xml_file,
+                                             input_file_name, keep_parsed)
+
+        return self.build_item(item_state, fields)
+
+    def clear_parsed(self):
+        """
+        Release the document kept by convert in the calling thread
+        """
+        self.thread_state.parsed_document = None
+
+    def create_lazy_item(self, parent_id=None, source_url=None, streaming=False, fields=None):
+        """
+        Parses the input xml file and returns an item which only runs the section extractors for a field
+        the first time the field is read. Use when most items are rejected after looking at a few fields
+        :param parent_id: Optional parameter with the parent id for the sciencebase item to be created
+        :param source_url: Optional parameter with the URL for original source
+        :param streaming: Optional boolean for whether to use the streaming parser
+        :param fields: Optional list of the sbjson item fields the item can have
+        :return: A lazyItem mapping, which can be turned into the create_item dictionary with to_dict()
+        """
+        item_state, fields = self.start_item(parent_id, source_url, streaming, None, fields)
 
+        return lazyItem(self, item_state, fields)
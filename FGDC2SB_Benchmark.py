@@ -0,0 +1,234 @@
+from FGDC2SB import FGDC2SB
+from Synthetic_Utils import syntheticFGDCGenerator
+from Walker_Utils import documentWalker
+from Input_Utils import open_xml_source
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+"""
+The modules whose import time is reported, and the heavy dependencies which should not be imported with them
+"""
+startup_modules = ["FGDC2SB"]
+deferred_modules = ["lxml.etree", "email_validator", "dns.resolver", "numpy", "decimal", "json"]
+
+"""
+The synthetic document sizes benchmarked by default. Each size multiplies the section counts of the small document
+"""
+document_sizes = {"small": 1, "medium": 10, "large": 100, "huge": 1000}
+
+
+def get_generator(scale, seed=0):
+    """
+    Create a synthetic document generator for a document size
+    :param scale: The number to multiply the section counts by
+    :param seed: The seed for the random values
+    :return: A syntheticFGDCGenerator
+    """
+    return syntheticFGDCGenerator(contacts=2 * scale, theme_keywords=10 * scale, place_keywords=5 * scale,
+                                  process_steps=3 * scale, online_links=2 * scale, network_resources=2 * scale,
+                                  time_periods=3 * scale, attributes=10 * scale, seed=seed)
+
+
+def get_sections(converter, xml_data):
+    """
+    Gets the section extractors run by create_item
+    :param converter: The FGDC2SB converter
+    :param xml_data: The walked xml file object
+    :return: A list of tuples with the section name and a function which runs the section
+    """
+    return [("parse", lambda: documentWalker(converter.parser_pool.parse(open_xml_source(converter.input_file)),
+                                             converter.get_walker_paths())),
+            ("description", lambda: converter.get_description(xml_data)),
+            ("identifiers", lambda: converter.get_identifiers(xml_data)),
+            ("spatial", lambda: converter.create_bounding_box(xml_data)),
+            ("citation", lambda: converter.create_citation_facets(xml_data)),
+            ("webLinks", lambda: converter.generate_web_links(xml_data, [])),
+            ("tags", lambda: converter.create_tags(xml_data)),
+            ("contacts", lambda: converter.generate_contact_info(xml_data)),
+            ("publicationDate", lambda: converter.get_publication_date_info(xml_data)),
+            ("timePeriods", lambda: converter.get_time_period_info(xml_data))]
+
+
+def time_function(function, repeat):
+    """
+    Time a function
+    :param function: The function to time
+    :param repeat: The number of times to run the function
+    :return: The mean run time in seconds
+    """
+    start = time.perf_counter()
+    for i in range(repeat):
+        function()
+
+    return (time.perf_counter() - start) / repeat
+
+
+def run_benchmark(size_name, scale, repeat, streaming=False):
+    """
+    Benchmark create_item and each of its sections for one document size
+    :param size_name: The name of the document size
+    :param scale: The number to multiply the section counts by
+    :param repeat: The number of times to convert the document
+    :param streaming: Boolean for whether create_item uses the streaming parser
+    :return: A dictionary with the benchmark results
+    """
+    input_xml_file = get_generator(scale).generate()
+    converter = FGDC2SB("synthetic.xml", input_xml_file, check_email_deliverability=False)
+    # Warm up the caches shared across records, as they would be in a harvest
+    converter.create_item(streaming=streaming)
+    item_seconds = time_function(lambda: converter.create_item(streaming=streaming), repeat)
+
+    xml_data = documentWalker(converter.parser_pool.parse(open_xml_source(input_xml_file)),
+                              converter.get_walker_paths())
+    section_seconds = {}
+    for section_name, section_function in get_sections(converter, xml_data):
+        section_seconds[section_name] = time_function(section_function, repeat)
+
+    return {
+        "size": size_name,
+        "bytes": len(input_xml_file),
+        "seconds": item_seconds,
+        "recordsPerSecond": 1 / item_seconds,
+        "megabytesPerSecond": len(input_xml_file) / 1048576 / item_seconds,
+        "sections": section_seconds
+    }
+
+
+def print_results(results):
+    """
+    Print benchmark results as a table
+    :param results: A list of benchmark result dictionaries
+    """
+    print("%-8s %12s %12s %12s %10s" % ("size", "bytes", "ms/record", "records/s", "MB/s"))
+    for result in results:
+        print("%-8s %12d %12.3f %12.1f %10.2f" % (result["size"], result["bytes"], result["seconds"] * 1000,
+                                                  result["recordsPerSecond"], result["megabytesPerSecond"]))
+    print("")
+    section_names = list(results[0]["sections"].keys())
+    print("%-16s" % "ms/section" + "".join(["%12s" % result["size"] for result in results]))
+    for section_name in section_names:
+        row = "%-16s" % section_name
+        for result in results:
+            row += "%12.3f" % (result["sections"][section_name] * 1000)
+        print(row)
+
+
+def get_import_seconds(importtime_output, module_name):
+    """
+    Gets the cumulative import time of a module from the output of -X importtime
+    :param importtime_output: The stderr of a python process run with -X importtime
+    :param module_name: The name of the module
+    :return: The import time in seconds, or 0 if the module is not listed
+    """
+    for line in importtime_output.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].strip() == module_name:
+            return int(line.split("|")[1]) / 1000000
+
+    return 0.0
+
+
+def measure_import_time(module_name, repeat=5):
+    """
+    Measure the cold start cost of importing a module in a new python process with -X importtime.
+    The time includes the standard library modules (re, datetime, ...) the module is the first to import
+    :param module_name: The name of the module to import
+    :param repeat: The number of new processes to time the import in. The fastest run is kept,
+    since slower runs only add noise from the rest of the machine
+    :return: A dictionary with the import time of the module in seconds, the slowest modules it imported
+    and the deferred modules which were imported anyway
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    check_code = "import sys, %s; print(','.join([m for m in %r if m in sys.modules]))" % (module_name,
+                                                                                           deferred_modules)
+    # Import once first so the timed import reads compiled bytecode, as it would in a deployed worker
+    subprocess.run([sys.executable, "-c", "import " + module_name], cwd=script_dir, check=True)
+    process = None
+    fastest_seconds = None
+    for i in range(repeat):
+        run_process = subprocess.run([sys.executable, "-X", "importtime", "-c", check_code], cwd=script_dir,
+                                     check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     universal_newlines=True)
+        run_seconds = get_import_seconds(run_process.stderr, module_name)
+        if fastest_seconds is None or run_seconds < fastest_seconds:
+            process = run_process
+            fastest_seconds = run_seconds
+    module_times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative_time, imported_name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the separator space
+        module_times.append((int(cumulative_time) / 1000000, imported_name[1:]))
+    seconds = 0.0
+    top_modules = []
+    for i in range(len(module_times)):
+        if module_times[i][1] == module_name:
+            seconds = module_times[i][0]
+            # Imports are listed before the module which imported them, so its direct imports are the
+            # indented lines just before it
+            for cumulative_seconds, imported_name in reversed(module_times[:i]):
+                if not imported_name.startswith("  "):
+                    break
+                if not imported_name.startswith("    "):
+                    top_modules.append((cumulative_seconds, imported_name.strip()))
+
+    return {
+        "module": module_name,
+        "seconds": seconds,
+        "slowest": sorted(top_modules, reverse=True)[:5],
+        "deferred": [name for name in process.stdout.strip().split(",") if name]
+    }
+
+
+def print_import_report(module_names, budget_seconds, repeat=5):
+    """
+    Print the cold start import cost of modules against a time budget
+    :param module_names: A list of the names of the modules to import
+    :param budget_seconds: The import time budget for each module in seconds
+    :param repeat: The number of new processes to time each import in
+    :return: Boolean for whether every module was imported within the budget, without importing any deferred module
+    """
+    within_budget = True
+    print("%-16s %12s %12s  %s" % ("module", "import ms", "budget ms", "deferred modules imported"))
+    for module_name in module_names:
+        report = measure_import_time(module_name, repeat)
+        if report["seconds"] > budget_seconds or len(report["deferred"]) > 0:
+            within_budget = False
+        print("%-16s %12.1f %12.1f  %s" % (module_name, report["seconds"] * 1000, budget_seconds * 1000,
+                                           ", ".join(report["deferred"]) or "none"))
+        for cumulative_seconds, imported_name in report["slowest"]:
+            print("    %-28s %8.1f" % (imported_name, cumulative_seconds * 1000))
+
+    return within_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FGDC2SB.create_item on synthetic FGDC documents")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium", "large"], choices=list(document_sizes.keys()))
+    parser.add_argument("--repeat", type=int, default=20, help="Number of conversions per document size")
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming parser")
+    parser.add_argument("--imports", action="store_true",
+                        help="Report the cold start import cost instead, exiting with 1 if it is over the budget")
+    parser.add_argument("--import-budget", type=float, default=50.0, help="Import time budget in milliseconds")
+    parser.add_argument("--import-repeat", type=int, default=5,
+                        help="Number of processes to time each import in, keeping the fastest")
+    parser.add_argument("--import-modules", nargs="+", default=startup_modules, help="Modules to report the import cost of")
+    args = parser.parse_args()
+
+    if args.imports:
+        if not print_import_report(args.import_modules, args.import_budget / 1000, args.import_repeat):
+            sys.exit(1)
+        return
+
+    results = []
+    for size_name in args.sizes:
+        repeat = max(1, args.repeat // document_sizes[size_name])
+        results.append(run_benchmark(size_name, document_sizes[size_name], repeat, args.streaming))
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
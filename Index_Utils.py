@@ -0,0 +1,210 @@
+from Spatial_Utils import get_numpy
+import json
+import os
+
+
+def split_bounding_box(bounding_box):
+    """
+    Split a bounding box which crosses the antimeridian (minX greater than maxX) into the boxes on each side of it
+    :param bounding_box: A dictionary with minX, maxX, minY and maxY, as in spatial.boundingBox of an sbjson item
+    :return: A list of (min_x, min_y, max_x, max_y) tuples
+    """
+    min_x = float(bounding_box["minX"])
+    max_x = float(bounding_box["maxX"])
+    min_y = float(bounding_box["minY"])
+    max_y = float(bounding_box["maxY"])
+    if min_x > max_x:
+        return [(min_x, min_y, 180.0, max_y), (-180.0, min_y, max_x, max_y)]
+
+    return [(min_x, min_y, max_x, max_y)]
+
+
+class spatialIndexBuilder:
+
+    def __init__(self, node_size=16):
+        """
+        Collects the bounding boxes of converted items and packs them into a spatialIndex
+        :param node_size: The number of entries in each node of the index tree
+        """
+        if get_numpy() is None:
+            raise ImportError("The spatial index requires numpy")
+        if node_size < 2:
+            raise ValueError("node_size must be at least 2")
+        self.node_size = node_size
+        self.item_keys = []
+        self.entry_boxes = []
+        self.entry_items = []
+
+    def add(self, item_key, bounding_box):
+        """
+        Add the bounding box of an item
+        :param item_key: The key returned for the item by queries, e.g. the input file path
+        :param bounding_box: A dictionary with minX, maxX, minY and maxY
+        """
+        item_number = len(self.item_keys)
+        self.item_keys.append(item_key)
+        for entry_box in split_bounding_box(bounding_box):
+            self.entry_boxes.append(entry_box)
+            self.entry_items.append(item_number)
+
+    def add_item(self, item_key, item_data):
+        """
+        Add a converted item if it has a bounding box
+        :param item_key: The key returned for the item by queries, e.g. the input file path
+        :param item_data: The sbjson item dictionary
+        :return: Boolean for whether the item had a bounding box
+        """
+        if item_data is None or "spatial" not in item_data or "boundingBox" not in item_data["spatial"]:
+            return False
+        self.add(item_key, item_data["spatial"]["boundingBox"])
+
+        return True
+
+    def build(self):
+        """
+        Pack the collected bounding boxes into a tree. The leaf entries are sorted with Sort-Tile-Recursive
+        packing (into vertical slices by the x of their centers, then by y within each slice) and every level
+        above groups node_size consecutive nodes of the level below
+        :return: A spatialIndex
+        """
+        numpy = get_numpy()
+        boxes = numpy.array(self.entry_boxes, dtype=numpy.float64).reshape(-1, 4)
+        items = numpy.array(self.entry_items, dtype=numpy.int64)
+        entry_count = len(boxes)
+        if entry_count > 0:
+            leaf_count = -(-entry_count // self.node_size)
+            slice_count = int(numpy.ceil(numpy.sqrt(leaf_count)))
+            slice_size = slice_count * self.node_size
+            center_x = (boxes[:, 0] + boxes[:, 2]) / 2
+            center_y = (boxes[:, 1] + boxes[:, 3]) / 2
+            x_order = numpy.argsort(center_x, kind="stable")
+            slice_numbers = numpy.empty(entry_count, dtype=numpy.int64)
+            slice_numbers[x_order] = numpy.arange(entry_count) // slice_size
+            order = numpy.lexsort((center_y, slice_numbers))
+            boxes = boxes[order]
+            items = items[order]
+
+        levels = [boxes]
+        while len(levels[-1]) > self.node_size:
+            child_boxes = levels[-1]
+            group_starts = numpy.arange(0, len(child_boxes), self.node_size)
+            node_boxes = numpy.empty((len(group_starts), 4), dtype=numpy.float64)
+            node_boxes[:, 0] = numpy.minimum.reduceat(child_boxes[:, 0], group_starts)
+            node_boxes[:, 1] = numpy.minimum.reduceat(child_boxes[:, 1], group_starts)
+            node_boxes[:, 2] = numpy.maximum.reduceat(child_boxes[:, 2], group_starts)
+            node_boxes[:, 3] = numpy.maximum.reduceat(child_boxes[:, 3], group_starts)
+            levels.append(node_boxes)
+
+        level_offsets = numpy.cumsum([0] + [len(level_boxes) for level_boxes in levels]).astype(numpy.int64)
+        tree_boxes = numpy.concatenate(levels) if entry_count > 0 else boxes
+
+        return spatialIndex(tree_boxes, level_offsets, items, list(self.item_keys), self.node_size)
+
+
+class spatialIndex:
+
+    def __init__(self, tree_boxes, level_offsets, entry_items, item_keys, node_size):
+        """
+        A packed R-tree of item bounding boxes stored as numpy arrays, for bounding box intersection and point queries
+        Build it with spatialIndexBuilder, or load a saved index with spatialIndex.load
+        :param tree_boxes: An (n, 4) array of min x, min y, max x, max y boxes. The leaf entries come first,
+        followed by the nodes of each level above them
+        :param level_offsets: An array with the position of each level in tree_boxes, plus the total size
+        :param entry_items: An array with the item number of each leaf entry
+        :param item_keys: A list with the key of each item
+        :param node_size: The number of entries in each node of the tree
+        """
+        self.tree_boxes = tree_boxes
+        self.level_offsets = level_offsets
+        self.entry_items = entry_items
+        self.item_keys = item_keys
+        self.node_size = node_size
+
+    def __len__(self):
+        return len(self.item_keys)
+
+    def save(self, index_dir):
+        """
+        Save the index to a directory, as .npy files which can be memory-mapped and a json list of the item keys
+        :param index_dir: The directory to save the index in
+        """
+        numpy = get_numpy()
+        os.makedirs(index_dir, exist_ok=True)
+        numpy.save(os.path.join(index_dir, "tree_boxes.npy"), self.tree_boxes)
+        numpy.save(os.path.join(index_dir, "level_offsets.npy"), self.level_offsets)
+        numpy.save(os.path.join(index_dir, "entry_items.npy"), self.entry_items)
+        with open(os.path.join(index_dir, "items.json"), "w") as items_file:
+            json.dump({"nodeSize": self.node_size, "itemKeys": self.item_keys}, items_file)
+
+    @classmethod
+    def load(cls, index_dir, memory_map=True):
+        """
+        Load an index saved with save
+        :param index_dir: The directory the index was saved in
+        :param memory_map: Boolean for whether to memory-map the arrays instead of reading them into memory,
+        so only the parts of the tree a query visits are read from disk
+        :return: A spatialIndex
+        """
+        numpy = get_numpy()
+        if numpy is None:
+            raise ImportError("The spatial index requires numpy")
+        mmap_mode = None
+        if memory_map:
+            mmap_mode = "r"
+        tree_boxes = numpy.load(os.path.join(index_dir, "tree_boxes.npy"), mmap_mode=mmap_mode)
+        level_offsets = numpy.load(os.path.join(index_dir, "level_offsets.npy"))
+        entry_items = numpy.load(os.path.join(index_dir, "entry_items.npy"), mmap_mode=mmap_mode)
+        with open(os.path.join(index_dir, "items.json")) as items_file:
+            items_info = json.load(items_file)
+
+        return cls(tree_boxes, level_offsets, entry_items, items_info["itemKeys"], items_info["nodeSize"])
+
+    def search_box(self, min_x, min_y, max_x, max_y):
+        """
+        Find the leaf entries whose boxes intersect a box, going down the tree one level at a time
+        and only testing the children of the nodes which intersect
+        :return: An array of the positions of the intersecting leaf entries
+        """
+        numpy = get_numpy()
+        level_count = len(self.level_offsets) - 1
+        if self.level_offsets[-1] == 0:
+            return numpy.empty(0, dtype=numpy.int64)
+        top_start = self.level_offsets[level_count - 1]
+        candidates = numpy.arange(self.level_offsets[level_count] - top_start, dtype=numpy.int64)
+        for level in range(level_count - 1, -1, -1):
+            level_start = self.level_offsets[level]
+            level_boxes = self.tree_boxes[level_start + candidates]
+            intersects = ((level_boxes[:, 0] <= max_x) & (level_boxes[:, 2] >= min_x) &
+                          (level_boxes[:, 1] <= max_y) & (level_boxes[:, 3] >= min_y))
+            candidates = candidates[intersects]
+            if level == 0 or len(candidates) == 0:
+                break
+            child_count = self.level_offsets[level] - self.level_offsets[level - 1]
+            children = (candidates[:, None] * self.node_size + numpy.arange(self.node_size)).ravel()
+            candidates = children[children < child_count]
+
+        return candidates
+
+    def query(self, bounding_box):
+        """
+        Find the items whose bounding boxes intersect a bounding box
+        :param bounding_box: A dictionary with minX, maxX, minY and maxY. If minX is greater than maxX
+        the box crosses the antimeridian
+        :return: A list of the keys of the intersecting items, in the order they were added
+        """
+        numpy = get_numpy()
+        entries = []
+        for min_x, min_y, max_x, max_y in split_bounding_box(bounding_box):
+            entries.append(self.search_box(min_x, min_y, max_x, max_y))
+        item_numbers = numpy.unique(self.entry_items[numpy.concatenate(entries)])
+
+        return [self.item_keys[item_number] for item_number in item_numbers]
+
+    def query_point(self, x, y):
+        """
+        Find the items whose bounding boxes contain a point
+        :param x: The longitude of the point
+        :param y: The latitude of the point
+        :return: A list of the keys of the items, in the order they were added
+        """
+        return self.query({"minX": x, "maxX": x, "minY": y, "maxY": y})
@@ -0,0 +1,67 @@
+from io import BytesIO
+import mmap
+import os
+
+
+class bufferReader:
+
+    def __init__(self, buffer):
+        """
+        A read only file object over a bytes-like buffer (memoryview, bytearray), so lxml can read
+        the buffer in chunks without it being copied into a new bytes object first
+        :param buffer: The bytes-like buffer with the xml data
+        """
+        self.buffer = memoryview(buffer).cast("B")
+        self.position = 0
+
+    def read(self, size=-1):
+        """
+        Read the next chunk of the buffer
+        :param size: The number of bytes to read, or -1 to read the rest of the buffer
+        :return: A bytes object with the chunk
+        """
+        if size is None or size < 0:
+            end = len(self.buffer)
+        else:
+            end = min(self.position + size, len(self.buffer))
+        chunk = self.buffer[self.position:end].tobytes()
+        self.position = end
+
+        return chunk
+
+
+def open_xml_source(input_xml_file):
+    """
+    Get an object lxml can parse from directly for each of the supported kinds of input
+    :param input_xml_file: The bytes of the xml file, a file system path, an open binary file object,
+    a memory-mapped file, or another bytes-like buffer
+    :return: A file system path or a binary file object positioned at the start of the xml data
+    """
+    if isinstance(input_xml_file, bytes):
+        return BytesIO(input_xml_file)
+    if isinstance(input_xml_file, (str, os.PathLike)):
+        return os.fspath(input_xml_file)
+    if isinstance(input_xml_file, mmap.mmap):
+        input_xml_file.seek(0)
+        return input_xml_file
+    if hasattr(input_xml_file, "read"):
+        if hasattr(input_xml_file, "seekable") and input_xml_file.seekable():
+            input_xml_file.seek(0)
+        return input_xml_file
+
+    return bufferReader(input_xml_file)
+
+
+def get_source_name(input_xml_file):
+    """
+    Get the file name of an xml input, when it has one
+    :param input_xml_file: A file system path or an open file object
+    :return: The base name of the file, or None if the input has no file name
+    """
+    if isinstance(input_xml_file, (str, os.PathLike)):
+        return os.path.basename(os.fspath(input_xml_file))
+    file_name = getattr(input_xml_file, "name", None)
+    if isinstance(file_name, str):
+        return os.path.basename(file_name)
+
+    return None
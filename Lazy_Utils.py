@@ -0,0 +1,67 @@
+from collections.abc import Mapping
+
+
+class lazyItem(Mapping):
+
+    def __init__(self, converter, item_state, fields):
+        """
+        A read only sbjson item which creates each field the first time it is read and keeps the value
+        :param converter: The FGDC2SB converter the item was created by
+        :param item_state: The item state dictionary from FGDC2SB.start_item, with the walked xml file object
+        :param fields: The list of sbjson item fields the item can have
+        """
+        self.converter = converter
+        self.item_state = item_state
+        self.fields = []
+        for field_name in converter.item_fields:
+            if field_name in fields:
+                self.fields.append(field_name)
+        self.field_values = {}
+
+    def get_field_value(self, field_name):
+        """
+        Gets the value of a field, running the section extractors for it the first time
+        :param field_name: The name of the sbjson item field
+        :return: The value of the field, or None if the item does not have the field
+        """
+        if field_name not in self.fields:
+            return None
+        if field_name not in self.field_values:
+            self.field_values[field_name] = self.converter.get_item_field(self.item_state, field_name)
+
+        return self.field_values[field_name]
+
+    def __getitem__(self, field_name):
+        field_value = self.get_field_value(field_name)
+        if field_value is None:
+            raise KeyError(field_name)
+
+        return field_value
+
+    def __contains__(self, field_name):
+        return self.get_field_value(field_name) is not None
+
+    def __iter__(self):
+        # Every field has to be created to know whether the item has it
+        for field_name in self.fields:
+            if self.get_field_value(field_name) is not None:
+                yield field_name
+
+    def __len__(self):
+        return sum(1 for field_name in self)
+
+    def __repr__(self):
+        created_fields = [field_name for field_name, field_value in self.field_values.items() if field_value is not None]
+
+        return "lazyItem(%s)" % ", ".join(created_fields)
+
+    def to_dict(self):
+        """
+        Create every remaining field and convert the item to a plain dictionary
+        :return: The same dictionary create_item returns
+        """
+        item_data = {}
+        for field_name in self:
+            item_data[field_name] = self.field_values[field_name]
+
+        return item_data
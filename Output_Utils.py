@@ -0,0 +1,102 @@
+import json
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class itemWriter:
+
+    def __init__(self, output_file=None, output_format="jsonl", use_fast_json=True):
+        """
+        Streams converted sbjson items to a file one item at a time, so a batch of items
+        never has to be held in memory to be serialized
+        :param output_file: Optional path of the output file. Items are written to stdout if it is None or "-"
+        :param output_format: "jsonl" for one item per line or "json" for a json array of items
+        :param use_fast_json: Boolean for whether to use orjson when it is installed. Both backends keep
+        the key order of the item dictionaries
+        """
+        if output_format not in ["jsonl", "json"]:
+            raise ValueError("Output format must be jsonl or json")
+        self.output_file = output_file
+        self.output_format = output_format
+        self.use_fast_json = use_fast_json and orjson is not None
+        self.output_stream = None
+        self.item_count = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        """
+        Open the output file, and start the json array if writing a json array
+        """
+        if self.output_file is None or self.output_file == "-":
+            self.output_stream = sys.stdout.buffer
+        else:
+            self.output_stream = open(self.output_file, "wb")
+        self.item_count = 0
+        if self.output_format == "json":
+            self.output_stream.write(b"[")
+
+    def close(self):
+        """
+        Finish the json array if writing a json array and close the output file
+        """
+        if self.output_stream is None:
+            return
+        if self.output_format == "json":
+            if self.item_count > 0:
+                self.output_stream.write(b"\n")
+            self.output_stream.write(b"]\n")
+        if self.output_stream is sys.stdout.buffer:
+            self.output_stream.flush()
+        else:
+            self.output_stream.close()
+        self.output_stream = None
+
+    def serialize_item(self, item_data):
+        """
+        Convert an item dictionary to json
+        :param item_data: The sbjson item dictionary
+        :return: The item as utf-8 encoded json bytes
+        """
+        if self.use_fast_json:
+            return orjson.dumps(item_data)
+
+        return json.dumps(item_data).encode("utf-8")
+
+    def write(self, item_data):
+        """
+        Write a single item to the output file
+        :param item_data: The sbjson item dictionary
+        """
+        if self.output_stream is None:
+            self.open()
+        item_json = self.serialize_item(item_data)
+        if self.output_format == "json":
+            if self.item_count > 0:
+                self.output_stream.write(b",")
+            self.output_stream.write(b"\n")
+            self.output_stream.write(item_json)
+        else:
+            self.output_stream.write(item_json)
+            self.output_stream.write(b"\n")
+        self.item_count += 1
+
+    def write_items(self, items):
+        """
+        Write items from a list or generator to the output file one at a time
+        :param items: A list or iterator of sbjson item dictionaries
+        :return: The number of items written
+        """
+        for item_data in items:
+            self.write(item_data)
+
+        return self.item_count
@@ -0,0 +1,97 @@
+import threading
+
+
+class xmlParserPool:
+
+    def __init__(self, remove_blank_text=False, huge_tree=False, recover=False, resolve_entities="internal",
+                 no_network=True, load_dtd=False):
+        """
+        Hands out tuned lxml XMLParser objects which are set up once and reused for every document, one per thread,
+        since a parser can only parse one document at a time. The defaults never fetch anything over the network
+        or read external DTDs, so a DOCTYPE pointing at an unreachable server can not hang an air-gapped worker
+        :param remove_blank_text: Optional boolean for whether to drop the whitespace between elements while parsing,
+        so the tree has fewer text nodes to build and walk. This also drops whitespace only text in mixed content
+        (<title>  <b/>x</title>), which changes the converted item, so it is off by default
+        :param huge_tree: Optional boolean, set to True to lift the libxml2 limits on tree depth and text node size
+        for very large records. Leave it off for untrusted files
+        :param recover: Optional boolean, set to True to convert slightly broken files (e.g. an unescaped & or
+        a missing end tag) from whatever the parser can recover instead of failing the record
+        :param resolve_entities: Optional setting for which entities are replaced with their values. "internal"
+        replaces the entities declared in the document itself (<!ENTITY agency "U.S. Geological Survey">) and
+        fails the parse on an external entity (a file or URL) instead of reading it. True also resolves external
+        entities, and False silently leaves every declared entity out of the text. The predefined xml entities
+        (&amp; etc.) are always replaced
+        :param no_network: Optional boolean for whether the parser is stopped from fetching anything over the network
+        :param load_dtd: Optional boolean for whether to load the DTD a file refers to
+        """
+        self.remove_blank_text = remove_blank_text
+        self.huge_tree = huge_tree
+        self.recover = recover
+        self.resolve_entities = resolve_entities
+        self.no_network = no_network
+        self.load_dtd = load_dtd
+        self.thread_parsers = threading.local()
+
+    def __getstate__(self):
+        # Parsers can not be pickled, so worker processes set up their own parsers from the settings
+        state = dict(self.__dict__)
+        del state["thread_parsers"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.thread_parsers = threading.local()
+
+    def get_settings(self):
+        """
+        Gets the parser settings, which are the same for XMLParser and iterparse
+        :return: A dictionary of the lxml parser keyword arguments
+        """
+        return {
+            "remove_blank_text": self.remove_blank_text,
+            "huge_tree": self.huge_tree,
+            "recover": self.recover,
+            "resolve_entities": self.resolve_entities,
+            "no_network": self.no_network,
+            "load_dtd": self.load_dtd
+        }
+
+    def get_key(self):
+        """
+        Gets a key for the parser settings, e.g. to share converters between pools with the same settings
+        :return: A tuple of the settings
+        """
+        return tuple(sorted(self.get_settings().items()))
+
+    def get_parser(self):
+        """
+        Gets the parser of the calling thread, setting it up the first time the thread asks for one
+        :return: An lxml XMLParser
+        """
+        parser = getattr(self.thread_parsers, "parser", None)
+        if parser is None:
+            from lxml import etree as etree
+
+            parser = etree.XMLParser(**self.get_settings())
+            self.thread_parsers.parser = parser
+
+        return parser
+
+    def parse(self, xml_source):
+        """
+        Parse an xml file with the parser of the calling thread
+        :param xml_source: A file name or binary file object with the xml data
+        :return: The parsed xml file object
+        """
+        from lxml import etree as etree
+
+        xml_tree = etree.parse(xml_source, self.get_parser())
+        # In recover mode a file with nothing to recover parses to a document without a root
+        if xml_tree.getroot() is None:
+            raise ValueError("The xml file has no root element")
+
+        return xml_tree
+
+
+# The parser pool used by converters which are not given one
+default_parser_pool = xmlParserPool()
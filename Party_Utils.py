@@ -0,0 +1,102 @@
+from collections import OrderedDict
+import threading
+
+
+def copy_parties(value, copied_dicts=None):
+    """
+    Copy contact entries made of dictionaries, lists and strings. Much faster than copy.deepcopy for this data,
+    and like deepcopy a dictionary shared between entries (e.g. primaryLocation) stays shared in the copy
+    :param value: The list of contact entries, or a value within them
+    :param copied_dicts: Dictionary of the copies already made, keyed by the id of the original dictionary
+    :return: The copied value
+    """
+    if copied_dicts is None:
+        copied_dicts = {}
+    if isinstance(value, dict):
+        copied_dict = copied_dicts.get(id(value))
+        if copied_dict is None:
+            copied_dict = {}
+            copied_dicts[id(value)] = copied_dict
+            for key, sub_value in value.items():
+                copied_dict[key] = copy_parties(sub_value, copied_dicts)
+        return copied_dict
+    if isinstance(value, list):
+        return [copy_parties(sub_value, copied_dicts) for sub_value in value]
+
+    return value
+
+
+class partyCache:
+
+    def __init__(self, max_size=4096):
+        """
+        A bounded, least recently used cache of the contact entries built from a cntinfo element, shared
+        across records. The same organization blocks repeat verbatim across many records, so they
+        only have to be built once
+        :param max_size: The maximum number of cntinfo fingerprints to keep
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_fingerprint(self, contact_type, cntinfo, check_email_deliverability=True, converter_class=None):
+        """
+        Create a canonical fingerprint for a cntinfo element and the options which change its contact entries
+        :param contact_type: The type of contact
+        :param cntinfo: The xml element with info about a contact
+        :param check_email_deliverability: Boolean for whether contact emails are checked with DNS lookups
+        :param converter_class: Optional class of the converter building the entries. Subclasses can override
+        how contacts are built (contact_order, load_party, ...), so each class gets its own entries
+        :return: The fingerprint bytes
+        """
+        from lxml import etree as etree
+        import hashlib
+
+        fingerprint_hash = hashlib.sha1(etree.tostring(cntinfo, method="c14n", with_comments=False))
+        fingerprint_hash.update(("\0%s\0%s" % (contact_type, check_email_deliverability)).encode("utf-8"))
+        if converter_class is not None:
+            class_name = "%s.%s" % (converter_class.__module__, converter_class.__qualname__)
+            fingerprint_hash.update(("\0%s" % class_name).encode("utf-8"))
+
+        return fingerprint_hash.digest()
+
+    def get(self, fingerprint):
+        """
+        Get the contact entries for a fingerprint
+        :param fingerprint: The cntinfo fingerprint
+        :return: A copy of the list of contact entries, or None if the fingerprint is not cached
+        """
+        with self.lock:
+            parties = self.entries.get(fingerprint)
+            if parties is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(fingerprint)
+            self.hits += 1
+
+        # Items are returned to callers who may change them, so never hand out the cached dictionaries
+        return copy_parties(parties)
+
+    def put(self, fingerprint, parties):
+        """
+        Store the contact entries built for a fingerprint, removing the least recently used entries when full
+        :param fingerprint: The cntinfo fingerprint
+        :param parties: The list of contact entries
+        """
+        parties = copy_parties(parties)
+        with self.lock:
+            self.entries[fingerprint] = parties
+            self.entries.move_to_end(fingerprint)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every cached entry
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
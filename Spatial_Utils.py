@@ -0,0 +1,273 @@
+import re
+
+# numpy is optional and slow to import, so it is only imported when the first G-Ring is parsed
+numpy = None
+numpy_checked = False
+
+
+def get_numpy():
+    """
+    Import numpy on first use
+    :return: The numpy module, or None if it is not installed
+    """
+    global numpy, numpy_checked
+    if not numpy_checked:
+        try:
+            import numpy as numpy_module
+            numpy = numpy_module
+        except ImportError:
+            numpy = None
+        numpy_checked = True
+
+    return numpy
+
+coordinate_separator_regex = re.compile(r"[\s,]+")
+
+
+def parse_rings(ring_texts):
+    """
+    Parse the coordinates of many G-Rings in one batch. Each ring is a list of longitude latitude pairs,
+    with the numbers separated by spaces and/or commas ("-77.5 38.2, -77.1 38.2, ...")
+    :param ring_texts: A list of G-Ring strings
+    :return: A list with a ring for each G-Ring string, or None where the string is not a valid ring. With numpy
+    each ring is an (n, 2) array view of one coordinate array, otherwise a list of (longitude, latitude) tuples
+    """
+    numpy = get_numpy()
+    ring_values = []
+    for ring_text in ring_texts:
+        values = None
+        if ring_text:
+            values = coordinate_separator_regex.split(ring_text.strip())
+            # A ring needs at least three points and complete longitude latitude pairs
+            if len(values) < 6 or len(values) % 2 != 0:
+                values = None
+        ring_values.append(values)
+
+    rings = [None] * len(ring_values)
+    if numpy is not None:
+        valid_rings = [i for i in range(len(ring_values)) if ring_values[i] is not None]
+        if len(valid_rings) == 0:
+            return rings
+        try:
+            coordinates = numpy.array([value for i in valid_rings for value in ring_values[i]], dtype=float)
+            coordinates = coordinates.reshape(-1, 2)
+            start = 0
+            for i in valid_rings:
+                ring_size = len(ring_values[i]) // 2
+                rings[i] = coordinates[start:start + ring_size]
+                start += ring_size
+        except ValueError:
+            # Parse the rings one at a time so a single bad ring does not drop the others
+            for i in valid_rings:
+                try:
+                    rings[i] = numpy.array(ring_values[i], dtype=float).reshape(-1, 2)
+                except ValueError:
+                    continue
+        for i in valid_rings:
+            if rings[i] is not None and not numpy.isfinite(rings[i]).all():
+                rings[i] = None
+        return rings
+
+    for i, values in enumerate(ring_values):
+        if values is None:
+            continue
+        try:
+            numbers = [float(value) for value in values]
+        except ValueError:
+            continue
+        if all([number - number == 0 for number in numbers]):
+            rings[i] = list(zip(numbers[0::2], numbers[1::2]))
+
+    return rings
+
+
+def get_ring_extent(ring):
+    """
+    Gets the extent of a ring. A ring with an edge longer than 180 degrees of longitude is taken to cross
+    the antimeridian, and its west longitude is then greater than its east longitude
+    :param ring: A ring from parse_rings
+    :return: A tuple with the west, east, south and north coordinates
+    """
+    numpy = get_numpy()
+    if numpy is not None:
+        longitudes = ring[:, 0]
+        latitudes = ring[:, 1]
+        south = float(latitudes.min())
+        north = float(latitudes.max())
+        if len(longitudes) > 1 and (numpy.abs(numpy.diff(longitudes)) > 180).any():
+            shifted = numpy.where(longitudes < 0, longitudes + 360, longitudes)
+            west = float(shifted.min())
+            east = float(shifted.max())
+        else:
+            west = float(longitudes.min())
+            east = float(longitudes.max())
+    else:
+        longitudes = [point[0] for point in ring]
+        latitudes = [point[1] for point in ring]
+        south = min(latitudes)
+        north = max(latitudes)
+        crosses = False
+        for i in range(1, len(longitudes)):
+            if abs(longitudes[i] - longitudes[i - 1]) > 180:
+                crosses = True
+                break
+        if crosses:
+            shifted = [longitude + 360 if longitude < 0 else longitude for longitude in longitudes]
+            west = min(shifted)
+            east = max(shifted)
+        else:
+            west = min(longitudes)
+            east = max(longitudes)
+    if west > 180:
+        west -= 360
+    if east > 180:
+        east -= 360
+
+    return west, east, south, north
+
+
+def combine_extents(extents):
+    """
+    Combine extents into the envelope which covers all of them. Extents which cross the antimeridian
+    (west greater than east) are combined on the circle of longitudes, so the envelope is the smallest
+    one which covers every extent. Otherwise the envelope is the plain minimum and maximum
+    :param extents: A list of tuples with the west, east, south and north coordinates
+    :return: A tuple with the west, east, south and north coordinates, or None if there are no extents
+    """
+    if len(extents) == 0:
+        return None
+
+    south = min([extent[2] for extent in extents])
+    north = max([extent[3] for extent in extents])
+    if all([extent[0] <= extent[1] for extent in extents]):
+        return min([extent[0] for extent in extents]), max([extent[1] for extent in extents]), south, north
+
+    # Longitude intervals as a start and a length going east, merged in order of their start
+    intervals = []
+    for extent in extents:
+        if extent[0] <= extent[1]:
+            intervals.append((extent[0], extent[1] - extent[0]))
+        else:
+            intervals.append((extent[0], (extent[1] - extent[0]) % 360))
+    intervals.sort()
+    merged = []
+    for start, length in intervals:
+        if merged and start <= merged[-1][0] + merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], start + length - merged[-1][0])
+        else:
+            merged.append([start, length])
+    # The last interval can wrap around past the start of the first one
+    if len(merged) > 1 and merged[-1][0] + merged[-1][1] >= merged[0][0] + 360:
+        last_start, last_length = merged.pop()
+        merged[0] = [last_start, max(last_length, merged[0][0] + 360 + merged[0][1] - last_start)]
+    if any([length >= 360 for start, length in merged]):
+        return -180.0, 180.0, south, north
+
+    # The envelope is everything except the largest gap between the merged intervals
+    largest_gap = None
+    for i in range(len(merged)):
+        gap_start = merged[i][0] + merged[i][1]
+        gap_end = merged[(i + 1) % len(merged)][0]
+        if i == len(merged) - 1:
+            gap_end += 360
+        if largest_gap is None or gap_end - gap_start > largest_gap[1] - largest_gap[0]:
+            largest_gap = (gap_start, gap_end)
+    west = largest_gap[1]
+    east = largest_gap[0]
+    while west > 180:
+        west -= 360
+    while east > 180:
+        east -= 360
+
+    return west, east, south, north
+
+
+def get_segment_distances(ring, first, last):
+    """
+    Gets the distance of the points between two points of a ring from the line through them
+    :param ring: A ring from parse_rings
+    :param first: The index of the first point
+    :param last: The index of the last point
+    :return: A list or array of the distances of the points first + 1 to last - 1
+    """
+    numpy = get_numpy()
+    if numpy is not None:
+        points = ring[first + 1:last]
+        start = ring[first]
+        delta = ring[last] - start
+        segment_length = numpy.hypot(delta[0], delta[1])
+        offsets = points - start
+        if segment_length == 0:
+            return numpy.hypot(offsets[:, 0], offsets[:, 1])
+        return numpy.abs(delta[0] * offsets[:, 1] - delta[1] * offsets[:, 0]) / segment_length
+
+    start_x, start_y = ring[first]
+    delta_x = ring[last][0] - start_x
+    delta_y = ring[last][1] - start_y
+    segment_length = (delta_x ** 2 + delta_y ** 2) ** 0.5
+    distances = []
+    for x, y in ring[first + 1:last]:
+        if segment_length == 0:
+            distances.append(((x - start_x) ** 2 + (y - start_y) ** 2) ** 0.5)
+        else:
+            distances.append(abs(delta_x * (y - start_y) - delta_y * (x - start_x)) / segment_length)
+
+    return distances
+
+
+def simplify_ring(ring, tolerance):
+    """
+    Simplify a ring with the Douglas-Peucker algorithm, keeping the points which are further than
+    the tolerance from the simplified outline
+    :param ring: A ring from parse_rings
+    :param tolerance: The tolerance in degrees. 0 keeps every point
+    :return: A closed list of [longitude, latitude] pairs
+    """
+    numpy = get_numpy()
+    ring_size = len(ring)
+    keep = [False] * ring_size
+    keep[0] = True
+    keep[-1] = True
+    if tolerance > 0 and ring_size > 2:
+        sections = [(0, ring_size - 1)]
+        while sections:
+            first, last = sections.pop()
+            if last - first < 2:
+                continue
+            distances = get_segment_distances(ring, first, last)
+            if numpy is not None:
+                furthest = int(distances.argmax())
+            else:
+                furthest = distances.index(max(distances))
+            if distances[furthest] > tolerance:
+                furthest += first + 1
+                keep[furthest] = True
+                sections.append((first, furthest))
+                sections.append((furthest, last))
+    else:
+        keep = [True] * ring_size
+
+    points = [[float(ring[i][0]), float(ring[i][1])] for i in range(ring_size) if keep[i]]
+    if points[0] != points[-1]:
+        points.append(list(points[0]))
+
+    return points
+
+
+def create_footprint(polygons, tolerance=0.0):
+    """
+    Create a GeoJSON MultiPolygon footprint from G-Polygons
+    :param polygons: A list of tuples with the outer ring and a list of the exclusion rings of each polygon
+    :param tolerance: The simplification tolerance in degrees
+    :return: A GeoJSON MultiPolygon dictionary, or None if there are no polygons
+    """
+    coordinates = []
+    for outer_ring, exclusion_rings in polygons:
+        polygon = [simplify_ring(outer_ring, tolerance)]
+        for exclusion_ring in exclusion_rings:
+            polygon.append(simplify_ring(exclusion_ring, tolerance))
+        coordinates.append(polygon)
+    if len(coordinates) == 0:
+        return None
+
+    return {"type": "MultiPolygon", "coordinates": coordinates}
@@ -0,0 +1,102 @@
+class streamingParser:
+
+    def __init__(self, keep_paths, existence_paths=None, parser_pool=None, descendant_tags=None):
+        """
+        Parses an xml file with iterparse and clears the subtrees which are not needed as they are read,
+        so only the sections used by the mapping are ever held in memory
+        :param keep_paths: A list of xml paths relative to the document root whose subtrees are kept whole
+        :param existence_paths: Optional list of xml paths which are only checked for existence.
+        The element is kept but everything inside it is cleared
+        :param parser_pool: Optional xmlParserPool from Parser_Utils whose settings iterparse is run with.
+        iterparse sets up its own parser for every file, so only the settings are shared
+        :param descendant_tags: Optional list of tags whose subtrees are kept whole wherever they are in the
+        document, for descendant paths (//browse). The elements on the way to them are kept as well
+        """
+        self.parser_pool = parser_pool
+        self.keep_paths = set(keep_paths)
+        self.existence_paths = set()
+        if existence_paths is not None:
+            self.existence_paths = set(existence_paths)
+        self.descendant_tags = set()
+        if descendant_tags is not None:
+            self.descendant_tags = set(descendant_tags)
+        self.path_prefixes = set()
+        for xml_path in self.keep_paths | self.existence_paths:
+            path_parts = xml_path.split("/")
+            for i in range(1, len(path_parts)):
+                self.path_prefixes.add("/".join(path_parts[:i]))
+
+    def get_path_state(self, element_path, parent_state, tag=None):
+        """
+        Works out what to do with an element once it has been fully read
+        :param element_path: The path of the element relative to the document root, or None if it is
+        inside a subtree which is not followed by path
+        :param parent_state: The state of the parent element
+        :param tag: Optional tag of the element, to match the descendant tags
+        :return: "keep" for elements in a kept subtree, "exist" for existence only elements,
+        "path" for elements on the way to a kept subtree and "drop" for everything else
+        """
+        if parent_state == "keep":
+            return "keep"
+        if tag in self.descendant_tags:
+            return "keep"
+        if parent_state in ["exist", "drop"]:
+            return "drop"
+        if element_path in self.keep_paths:
+            return "keep"
+        if element_path in self.existence_paths:
+            return "exist"
+        if element_path in self.path_prefixes:
+            return "path"
+
+        return "drop"
+
+    def parse(self, xml_source):
+        """
+        Parse an xml file, dropping unneeded subtrees as soon as their end tag is read
+        :param xml_source: A file name or binary file object with the xml data
+        :return: The parsed and pruned xml file object
+        """
+        from lxml import etree as etree
+
+        parser_settings = {}
+        if self.parser_pool is not None:
+            parser_settings = self.parser_pool.get_settings()
+        # Each entry is [element path, state], so the state of the open ancestors can be changed
+        # when a descendant tag is found inside a subtree which would otherwise be dropped
+        state_stack = []
+        root = None
+        for event, element in etree.iterparse(xml_source, events=("start", "end"), remove_comments=True,
+                                              **parser_settings):
+            if event == "start":
+                if root is None:
+                    root = element
+                    state_stack.append(["", "path"])
+                    continue
+                parent_path, parent_state = state_stack[-1]
+                element_path = None
+                if parent_state == "path" and parent_path is not None:
+                    if parent_path:
+                        element_path = parent_path + "/" + element.tag
+                    else:
+                        element_path = element.tag
+                element_state = self.get_path_state(element_path, parent_state, element.tag)
+                if element_state == "keep" and parent_state != "keep":
+                    for ancestor_state in reversed(state_stack):
+                        if ancestor_state[1] != "drop":
+                            break
+                        ancestor_state[1] = "path"
+                state_stack.append([element_path, element_state])
+                continue
+
+            element_path, element_state = state_stack.pop()
+            if element_state == "drop":
+                parent = element.getparent()
+                element.clear()
+                if parent is not None:
+                    parent.remove(element)
+
+        if root is None:
+            raise ValueError("The xml file has no root element")
+
+        return etree.ElementTree(root)
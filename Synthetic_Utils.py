@@ -0,0 +1,188 @@
+from lxml import etree as etree
+import random
+
+
+class syntheticFGDCGenerator:
+
+    def __init__(self, contacts=2, theme_keywords=10, place_keywords=5, process_steps=3, online_links=2,
+                 network_resources=2, time_periods=2, attributes=10, seed=0):
+        """
+        Generates synthetic CSDGM (FGDC) xml documents with tunable section sizes, for benchmarks
+        :param contacts: The number of cntinfo contacts, split between the point of contact, process,
+        distributor and metadata contact sections
+        :param theme_keywords: The number of themekey keywords
+        :param place_keywords: The number of placekey keywords
+        :param process_steps: The number of procstep entries
+        :param online_links: The number of onlink elements in the citation
+        :param network_resources: The number of digform entries, each with a networkr resource
+        :param time_periods: The number of timeinfo entries, cycling through single, multiple and range dates
+        :param attributes: The number of eainfo attributes
+        :param seed: The seed for the random values, so the same parameters always give the same document
+        """
+        self.contacts = contacts
+        self.theme_keywords = theme_keywords
+        self.place_keywords = place_keywords
+        self.process_steps = process_steps
+        self.online_links = online_links
+        self.network_resources = network_resources
+        self.time_periods = time_periods
+        self.attributes = attributes
+        self.seed = seed
+
+    def add_text_element(self, parent, tag, text):
+        """
+        Add an element with text to a parent element
+        :param parent: The parent xml element
+        :param tag: The tag of the new element
+        :param text: The text of the new element
+        :return: The new xml element
+        """
+        element = etree.SubElement(parent, tag)
+        element.text = text
+
+        return element
+
+    def add_contact(self, parent, rng, index):
+        """
+        Add a cntinfo contact, alternating between person and organization contacts
+        :param parent: The parent xml element
+        :param rng: The random number generator
+        :param index: The number of the contact
+        """
+        cntinfo = etree.SubElement(parent, "cntinfo")
+        if index % 2 == 0:
+            cntperp = etree.SubElement(cntinfo, "cntperp")
+            self.add_text_element(cntperp, "cntper", "Person %d" % index)
+            self.add_text_element(cntperp, "cntorg", "Organization %d" % rng.randint(0, 20))
+        else:
+            cntorgp = etree.SubElement(cntinfo, "cntorgp")
+            self.add_text_element(cntorgp, "cntorg", "Organization %d" % rng.randint(0, 20))
+            self.add_text_element(cntorgp, "cntper", "Person %d" % index)
+        self.add_text_element(cntinfo, "cntpos", "Scientist")
+        cntaddr = etree.SubElement(cntinfo, "cntaddr")
+        self.add_text_element(cntaddr, "addrtype", rng.choice(["mailing", "physical", "mailing and physical"]))
+        self.add_text_element(cntaddr, "address", "%d Main St" % rng.randint(1, 999))
+        self.add_text_element(cntaddr, "city", "Denver")
+        self.add_text_element(cntaddr, "state", "CO")
+        self.add_text_element(cntaddr, "postal", "80225")
+        self.add_text_element(cntaddr, "country", "USA")
+        self.add_text_element(cntinfo, "cntvoice", "303-555-%04d" % rng.randint(0, 9999))
+        self.add_text_element(cntinfo, "cntemail", "person%d@usgs.gov" % index)
+
+    def add_time_period(self, parent, rng, index):
+        """
+        Add a timeinfo entry, cycling through single, multiple and range dates
+        :param parent: The parent timeperd xml element
+        :param rng: The random number generator
+        :param index: The number of the time period
+        """
+        timeinfo = etree.SubElement(parent, "timeinfo")
+        year = rng.randint(1950, 2020)
+        if index % 3 == 0:
+            sngdate = etree.SubElement(timeinfo, "sngdate")
+            self.add_text_element(sngdate, "caldate", "%d%02d%02d" % (year, rng.randint(1, 12), rng.randint(1, 28)))
+        elif index % 3 == 1:
+            mdattim = etree.SubElement(timeinfo, "mdattim")
+            for i in range(3):
+                sngdate = etree.SubElement(mdattim, "sngdate")
+                self.add_text_element(sngdate, "caldate", "%d-%02d" % (year + i, rng.randint(1, 12)))
+                self.add_text_element(sngdate, "time", "%02d%02d" % (rng.randint(0, 23), rng.randint(0, 59)))
+        else:
+            rngdates = etree.SubElement(timeinfo, "rngdates")
+            self.add_text_element(rngdates, "begdate", "%d" % year)
+            self.add_text_element(rngdates, "enddate", "%d" % (year + rng.randint(1, 5)))
+
+    def generate(self):
+        """
+        Generate a synthetic FGDC xml document
+        :return: The bytes of the xml document
+        """
+        rng = random.Random(self.seed)
+        metadata = etree.Element("metadata")
+        idinfo = etree.SubElement(metadata, "idinfo")
+        citeinfo = etree.SubElement(etree.SubElement(idinfo, "citation"), "citeinfo")
+        self.add_text_element(citeinfo, "origin", "U.S. Geological Survey")
+        self.add_text_element(citeinfo, "pubdate", "%d" % rng.randint(1990, 2020))
+        self.add_text_element(citeinfo, "title", "Synthetic dataset %d" % self.seed)
+        self.add_text_element(citeinfo, "geoform", "vector digital data")
+        pubinfo = etree.SubElement(citeinfo, "pubinfo")
+        self.add_text_element(pubinfo, "pubplace", "Reston, VA")
+        self.add_text_element(pubinfo, "publish", "U.S. Geological Survey")
+        for i in range(self.online_links):
+            self.add_text_element(citeinfo, "onlink", "https://example.com/data/%d/file%d.zip" % (self.seed, i))
+
+        descript = etree.SubElement(idinfo, "descript")
+        self.add_text_element(descript, "abstract", " ".join(["synthetic"] * 200))
+        self.add_text_element(descript, "purpose", "Benchmarking")
+
+        timeperd = etree.SubElement(idinfo, "timeperd")
+        for i in range(self.time_periods):
+            self.add_time_period(timeperd, rng, i)
+        self.add_text_element(timeperd, "current", "ground condition")
+
+        status = etree.SubElement(idinfo, "status")
+        self.add_text_element(status, "progress", "Complete")
+        self.add_text_element(status, "update", "None planned")
+
+        bounding = etree.SubElement(etree.SubElement(idinfo, "spdom"), "bounding")
+        west = rng.uniform(-180, 170)
+        south = rng.uniform(-90, 80)
+        self.add_text_element(bounding, "westbc", "%.4f" % west)
+        self.add_text_element(bounding, "eastbc", "%.4f" % (west + rng.uniform(0.1, 10)))
+        self.add_text_element(bounding, "northbc", "%.4f" % (south + rng.uniform(0.1, 10)))
+        self.add_text_element(bounding, "southbc", "%.4f" % south)
+
+        keywords = etree.SubElement(idinfo, "keywords")
+        theme = etree.SubElement(keywords, "theme")
+        self.add_text_element(theme, "themekt", "USGS Thesaurus")
+        for i in range(self.theme_keywords):
+            self.add_text_element(theme, "themekey", "theme keyword %d" % rng.randint(0, 500))
+        place = etree.SubElement(keywords, "place")
+        self.add_text_element(place, "placekt", "GNIS")
+        for i in range(self.place_keywords):
+            self.add_text_element(place, "placekey", "place keyword %d" % rng.randint(0, 500))
+
+        contact_sections = [etree.SubElement(idinfo, "ptcontac")]
+        browse = etree.SubElement(idinfo, "browse")
+        self.add_text_element(browse, "browsen", "https://example.com/browse/%d.png" % self.seed)
+        self.add_text_element(browse, "browsed", "Browse graphic")
+
+        lineage = etree.SubElement(etree.SubElement(metadata, "dataqual"), "lineage")
+        for i in range(self.process_steps):
+            procstep = etree.SubElement(lineage, "procstep")
+            self.add_text_element(procstep, "procdesc", "Process step %d" % i)
+            self.add_text_element(procstep, "procdate", "%d" % rng.randint(1990, 2020))
+            if i < self.contacts:
+                contact_sections.append(etree.SubElement(procstep, "proccont"))
+
+        if self.attributes > 0:
+            detailed = etree.SubElement(etree.SubElement(metadata, "eainfo"), "detailed")
+            enttyp = etree.SubElement(detailed, "enttyp")
+            self.add_text_element(enttyp, "enttypl", "Attribute table")
+            for i in range(self.attributes):
+                attr = etree.SubElement(detailed, "attr")
+                self.add_text_element(attr, "attrlabl", "FIELD_%d" % i)
+                self.add_text_element(attr, "attrdef", "Definition of field %d" % i)
+                self.add_text_element(attr, "attrdefs", "Producer defined")
+
+        distinfo = etree.SubElement(metadata, "distinfo")
+        contact_sections.append(etree.SubElement(distinfo, "distrib"))
+        stdorder = etree.SubElement(distinfo, "stdorder")
+        for i in range(self.network_resources):
+            digform = etree.SubElement(stdorder, "digform")
+            digtinfo = etree.SubElement(digform, "digtinfo")
+            self.add_text_element(digtinfo, "formname", "Format %d" % i)
+            self.add_text_element(digtinfo, "transize", "%.1f" % rng.uniform(0.1, 500))
+            networka = etree.SubElement(etree.SubElement(etree.SubElement(etree.SubElement(
+                digform, "digtopt"), "onlinopt"), "computer"), "networka")
+            self.add_text_element(networka, "networkr", "https://example.com/download/%d/%d.zip" % (self.seed, i))
+
+        metainfo = etree.SubElement(metadata, "metainfo")
+        self.add_text_element(metainfo, "metd", "20200101")
+        contact_sections.append(etree.SubElement(metainfo, "metc"))
+
+        # Spread the contacts over the contact sections, with at least one in each section
+        for i in range(max(self.contacts, len(contact_sections))):
+            self.add_contact(contact_sections[i % len(contact_sections)], rng, i)
+
+        return etree.tostring(metadata, xml_declaration=True, encoding="UTF-8")
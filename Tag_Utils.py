@@ -0,0 +1,156 @@
+from collections import Counter
+import sys
+import threading
+
+
+class tagVocabulary:
+
+    def __init__(self, max_size=65536):
+        """
+        A table of interned tags shared across records. The same keyword and thesaurus pairs repeat across
+        a corpus, so every record gets the same tag dictionary and strings for a pair instead of its own copy.
+        Interned tags are shared, so they must not be changed by callers
+        :param max_size: The maximum number of distinct tags to intern. Tags seen after the table is full
+        are returned as new dictionaries
+        """
+        self.max_size = max_size
+        self.tags = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.tags)
+
+    def get_tag(self, tag_type, scheme, name):
+        """
+        Get the interned tag for a keyword
+        :param tag_type: The type of the tag, e.g. Theme
+        :param scheme: The thesaurus of the keyword, or None or "" if it has none
+        :param name: The keyword
+        :return: The tag dictionary with the type, the scheme if there is one and the name
+        """
+        # Keywords without a thesaurus share one entry, whether their scheme is given as None or ""
+        if not scheme:
+            scheme = ""
+        tag_key = (tag_type, scheme, name)
+        sb_tag = self.tags.get(tag_key)
+        if sb_tag is not None:
+            with self.lock:
+                self.hits += 1
+            return sb_tag
+
+        sb_tag = {"type": sys.intern(tag_type)}
+        if scheme:
+            sb_tag["scheme"] = sys.intern(scheme)
+        sb_tag["name"] = sys.intern(name)
+        with self.lock:
+            self.misses += 1
+            if len(self.tags) < self.max_size:
+                sb_tag = self.tags.setdefault(tag_key, sb_tag)
+
+        return sb_tag
+
+    def intern_tags(self, tag_list):
+        """
+        Replace the tags of an item, e.g. one returned by a batch worker process, with the interned tags
+        :param tag_list: A list of tag dictionaries
+        :return: A list of the interned tag dictionaries
+        """
+        interned_tags = []
+        for sb_tag in tag_list:
+            if set(sb_tag.keys()) <= {"type", "scheme", "name"} and "type" in sb_tag and "name" in sb_tag:
+                interned_tags.append(self.get_tag(sb_tag["type"], sb_tag.get("scheme") or "", sb_tag["name"]))
+            else:
+                interned_tags.append(sb_tag)
+
+        return interned_tags
+
+    def clear(self):
+        """
+        Remove every interned tag
+        """
+        with self.lock:
+            self.tags.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class keywordStatistics:
+
+    def __init__(self):
+        """
+        Counts keyword frequencies per thesaurus as items are converted, so vocabulary statistics for a
+        corpus are collected without a second pass over the items. Keywords without a thesaurus are counted
+        under an empty scheme
+        """
+        self.scheme_counts = {}
+        self.item_count = 0
+        self.lock = threading.Lock()
+
+    def add_tags(self, tag_list):
+        """
+        Count the tags of one item
+        :param tag_list: A list of tag dictionaries
+        """
+        with self.lock:
+            self.item_count += 1
+            for sb_tag in tag_list:
+                name = sb_tag.get("name")
+                if not name:
+                    continue
+                scheme = sb_tag.get("scheme") or ""
+                keyword_counts = self.scheme_counts.get(scheme)
+                if keyword_counts is None:
+                    keyword_counts = Counter()
+                    self.scheme_counts[scheme] = keyword_counts
+                keyword_counts[name] += 1
+
+    def add_item(self, item_data):
+        """
+        Count the tags of a converted item
+        :param item_data: The sbjson item dictionary, or None for a record which failed to convert
+        :return: Boolean for whether the item was counted
+        """
+        if item_data is None:
+            return False
+        self.add_tags(item_data.get("tags", []))
+
+        return True
+
+    def merge(self, other):
+        """
+        Add the counts of another keywordStatistics, e.g. one collected in another process
+        :param other: A keywordStatistics
+        """
+        with self.lock:
+            self.item_count += other.item_count
+            for scheme, keyword_counts in other.scheme_counts.items():
+                if scheme not in self.scheme_counts:
+                    self.scheme_counts[scheme] = Counter()
+                self.scheme_counts[scheme].update(keyword_counts)
+
+    def get_counts(self, scheme):
+        """
+        Gets the keyword counts for one thesaurus
+        :param scheme: The thesaurus, or "" for keywords without one
+        :return: A dictionary of keyword counts, most frequent first
+        """
+        return dict(self.scheme_counts.get(scheme, Counter()).most_common())
+
+    def get_summary(self, top=10):
+        """
+        Gets the keyword statistics for every thesaurus, the thesaurus with the most keywords first
+        :param top: The number of most frequent keywords to list for each thesaurus
+        :return: A dictionary with the number of items counted and the statistics for each thesaurus
+        """
+        schemes = {}
+        for scheme in sorted(self.scheme_counts, key=lambda name: sum(self.scheme_counts[name].values()), reverse=True):
+            keyword_counts = self.scheme_counts[scheme]
+            schemes[scheme] = {
+                "keywords": len(keyword_counts),
+                "count": sum(keyword_counts.values()),
+                "top": keyword_counts.most_common(top)
+            }
+
+        return {"items": self.item_count, "schemes": schemes}
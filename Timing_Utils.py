@@ -0,0 +1,128 @@
+import json
+import time
+
+
+class conversionTracer:
+
+    def __init__(self, callbacks=None, measure_size=True):
+        """
+        Records the wall time, element counts and output sizes of each create_item stage for each record,
+        and aggregates them across a batch
+        :param callbacks: Optional list of functions called after each stage as callback(record_name, stage_name, stats)
+        :param measure_size: Boolean for whether to measure the json size of each stage output
+        """
+        self.callbacks = []
+        if callbacks is not None:
+            self.callbacks = list(callbacks)
+        self.measure_size = measure_size
+        self.records = []
+        self.totals = {}
+        self.current_record = None
+
+    def start_record(self, record_name):
+        """
+        Start recording the stages of a record
+        :param record_name: The name of the record, usually the input file name
+        """
+        self.current_record = {"name": record_name, "seconds": 0.0, "stages": {}}
+        self.record_start = time.perf_counter()
+
+    def end_record(self):
+        """
+        Finish recording the current record and add it to the batch totals
+        :return: The dictionary with the stage stats of the record
+        """
+        record = self.current_record
+        record["seconds"] = time.perf_counter() - self.record_start
+        self.current_record = None
+        self.add_record(record)
+
+        return record
+
+    def add_record(self, record):
+        """
+        Add the stage stats of a record to the batch totals. Also used to collect the records traced in
+        batch worker processes
+        :param record: A dictionary with the stage stats of a record
+        """
+        self.records.append(record)
+        for stage_name, stats in record["stages"].items():
+            if stage_name not in self.totals:
+                self.totals[stage_name] = {"calls": 0, "seconds": 0.0, "elements": 0, "size": 0}
+            stage_totals = self.totals[stage_name]
+            stage_totals["calls"] += 1
+            stage_totals["seconds"] += stats["seconds"]
+            stage_totals["elements"] += stats["elements"]
+            stage_totals["size"] += stats["size"]
+
+    def get_element_count(self, output):
+        """
+        Count the elements in the output of a stage
+        :param output: The output of a stage
+        :return: The number of xml elements for a parsed document, the number of entries for a list or
+        dictionary, or 1 for any other non empty value
+        """
+        if hasattr(output, "getroot"):
+            return sum(1 for element in output.getroot().iter())
+        if isinstance(output, (list, tuple, dict)):
+            return len(output)
+        if output:
+            return 1
+
+        return 0
+
+    def get_output_size(self, output):
+        """
+        Measure the json size of the output of a stage
+        :param output: The output of a stage
+        :return: The number of characters in the json for the output, or 0 if it can not be serialized
+        """
+        if not self.measure_size or hasattr(output, "getroot"):
+            return 0
+        try:
+            return len(json.dumps(output))
+        except (TypeError, ValueError):
+            return 0
+
+    def run_stage(self, stage_name, function, *args):
+        """
+        Run a stage of the conversion and record its stats
+        :param stage_name: The name of the stage
+        :param function: The function which runs the stage
+        :param args: The arguments for the function
+        :return: The output of the stage
+        """
+        start = time.perf_counter()
+        output = function(*args)
+        stats = {
+            "seconds": time.perf_counter() - start,
+            "elements": self.get_element_count(output),
+            "size": self.get_output_size(output)
+        }
+        record_name = None
+        if self.current_record is not None:
+            self.current_record["stages"][stage_name] = stats
+            record_name = self.current_record["name"]
+        for callback in self.callbacks:
+            callback(record_name, stage_name, stats)
+
+        return output
+
+    def get_summary(self):
+        """
+        Gets the stage totals for every record traced so far, slowest stage first
+        :return: A dictionary with the number of records, their total time and the totals for each stage
+        """
+        total_seconds = 0.0
+        for record in self.records:
+            total_seconds += record["seconds"]
+        stages = {}
+        for stage_name in sorted(self.totals, key=lambda name: self.totals[name]["seconds"], reverse=True):
+            stage_totals = dict(self.totals[stage_name])
+            if total_seconds > 0:
+                stage_totals["share"] = stage_totals["seconds"] / total_seconds
+            else:
+                stage_totals["share"] = 0.0
+            stages[stage_name] = stage_totals
+
+        return {"records": len(self.records), "seconds": total_seconds, "stages": stages}
@@ -0,0 +1,129 @@
+class walkerPaths:
+
+    def __init__(self, xml_paths):
+        """
+        The xml paths collected by a documentWalker, split up once so many documents can be walked with them
+        :param xml_paths: A list of xml paths to collect elements for. Paths are either relative to the
+        document root (idinfo/citation/citeinfo/title) or descendant paths (//browse)
+        """
+        self.xml_paths = list(xml_paths)
+        self.relative_paths = set()
+        self.path_prefixes = set()
+        self.descendant_tags = []
+
+        for xml_path in self.xml_paths:
+            if xml_path.startswith("//"):
+                self.descendant_tags.append(xml_path[2:])
+            else:
+                self.relative_paths.add(xml_path)
+                path_parts = xml_path.split("/")
+                for i in range(1, len(path_parts)):
+                    self.path_prefixes.add("/".join(path_parts[:i]))
+
+
+class documentWalker:
+
+    def __init__(self, xml_data, xml_paths):
+        """
+        Walks a parsed xml document a single time and sends each element to the bucket of
+        every xml path it matches, so the section methods read their elements from the buckets
+        instead of searching the whole document again
+        :param xml_data: The parsed xml file object
+        :param xml_paths: A walkerPaths, or a list of xml paths to collect elements for. Paths are either relative
+        to the document root (idinfo/citation/citeinfo/title) or descendant paths (//browse)
+        """
+        if not isinstance(xml_paths, walkerPaths):
+            xml_paths = walkerPaths(xml_paths)
+        self.xml_data = xml_data
+        self.relative_paths = xml_paths.relative_paths
+        self.path_prefixes = xml_paths.path_prefixes
+        self.descendant_tags = xml_paths.descendant_tags
+        self.buckets = {}
+        for xml_path in xml_paths.xml_paths:
+            self.buckets[xml_path] = []
+
+        self.walk_element(xml_data.getroot(), "")
+
+    def walk_element(self, element, element_path):
+        """
+        Visits the children of an element in document order and adds them to the matching buckets
+        Subtrees which are not on the way to any relative path are only searched for descendant paths
+        :param element: The xml element to walk the children of
+        :param element_path: The path of the element relative to the document root
+        """
+        for child in element:
+            tag = child.tag
+            if not isinstance(tag, str):
+                continue
+            if element_path:
+                child_path = element_path + "/" + tag
+            else:
+                child_path = tag
+            if child_path in self.relative_paths:
+                self.buckets[child_path].append(child)
+            if child_path in self.path_prefixes:
+                if tag in self.descendant_tags:
+                    self.buckets["//" + tag].append(child)
+                self.walk_element(child, child_path)
+            elif self.descendant_tags:
+                for sub_element in child.iter(*self.descendant_tags):
+                    self.buckets["//" + sub_element.tag].append(sub_element)
+
+    def getroot(self):
+        """
+        Gets the root element of the walked xml document
+        :return: The root lxml etree element
+        """
+        return self.xml_data.getroot()
+
+    def findall(self, xml_path):
+        """
+        Finds the elements for an xml path, using the buckets filled by the walk when the path was collected
+        :param xml_path: The path in the xml file to search for data in
+        :return: A list of lxml etree elements in document order
+        """
+        if xml_path in self.buckets:
+            return self.buckets[xml_path]
+
+        return self.xml_data.findall(xml_path)
+
+
+class subtreeIndex:
+
+    def __init__(self, root_element):
+        """
+        Indexes the elements of a subtree by tag in a single pass, so a section extractor which looks up many
+        tags within the same element (cntinfo, cntaddr, rngdates, ...) does not rescan the subtree for each tag
+        :param root_element: The xml element at the root of the subtree. It is included in the index,
+        the same as with root_element.iter()
+        """
+        self.root_element = root_element
+        self.tag_elements = {}
+        for element in root_element.iter():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            if tag in self.tag_elements:
+                self.tag_elements[tag].append(element)
+            else:
+                self.tag_elements[tag] = [element]
+
+    def first(self, tag):
+        """
+        Gets the first element in the subtree with a tag
+        :param tag: The tag of the element
+        :return: The first lxml etree element with the tag in document order, or None if there is none
+        """
+        elements = self.tag_elements.get(tag)
+        if elements:
+            return elements[0]
+
+        return None
+
+    def all(self, tag):
+        """
+        Gets all of the elements in the subtree with a tag
+        :param tag: The tag of the elements
+        :return: A list of lxml etree elements in document order
+        """
+        return self.tag_elements.get(tag, [])
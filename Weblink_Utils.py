@@ -1,19 +1,80 @@
+from functools import lru_cache
 import re
 
+"""
+The regex patterns used to classify web links. They are compiled once when the module is imported
+and shared by every webLinkHandler
+"""
+image_regex_pattern = re.compile('.(?:jpg|jpeg|tiff|gif|png)$', re.IGNORECASE)
+archive_regex_pattern = re.compile('.(?:pdf|doc|tif|zip|gz|tar|7z|laz)$', re.IGNORECASE)
+# A single pattern with a named group for each of the url markers, so a url is only searched once.
+# The thumbnail group is used for both the csw portal and ogc checks
+url_marker_regex_pattern = re.compile('(?P<thumbnail>thumbnail)'
+                                      '|(?P<wms>service=wms)'
+                                      '|(?P<wfs>service=wfs)'
+                                      '|(?P<legend>request=getLegendGraphic)'
+                                      '|(?P<feature_info>request=getFeatureInfo)'
+                                      '|(?P<original_metadata>getxml=)'
+                                      '|(?P<catalog_item>(?-i:sciencebase.gov/catalog/(?:item|folder)))',
+                                      re.IGNORECASE)
+
+
+@lru_cache(maxsize=65536)
+def classify_web_link(url_string):
+    """
+    Classify a url string with the shared regex patterns. Results are cached by url since the
+    same service and catalog urls repeat across many records
+    :param url_string: The url string of a web link
+    :return: A tuple with the cleaned up uri, the web link type and the web link title (or None)
+    """
+    url_string = url_string.replace(" ", "%20")
+    url_string = url_string.replace("[<|>]", "")
+    link_type = None
+    link_title = None
+    last_dot_index = url_string.rfind(".")
+    if last_dot_index > 0:
+        extension = url_string[last_dot_index:]
+        if image_regex_pattern.search(extension):
+            link_type = "browseImage"
+        elif archive_regex_pattern.search(extension):
+            link_type = "download"
+
+    url_markers = set()
+    for marker_matcher in url_marker_regex_pattern.finditer(url_string):
+        url_markers.add(marker_matcher.lastgroup)
+
+    if "thumbnail" in url_markers:
+        link_type = "serviceCapabilitiesUrl"
+        if "wms" in url_markers:
+            link_title = "OGC WMS Capabilities"
+        elif "wfs" in url_markers:
+            link_type = "serviceWfsBackingUrl"
+            link_title = "OGC WFS Capabilities"
+        else:
+            link_title = "OGC Capabilities"
+    elif "legend" in url_markers:
+        link_type = "serviceLegendUrl"
+        link_title = "Legend"
+    elif "feature_info" in url_markers:
+        link_type = "serviceFeatureInfoUrl"
+        link_title = "Feature Info"
+    elif "original_metadata" in url_markers:
+        link_type = "originalMetadata"
+        link_title = "Original Metadata (XML)"
+    elif "catalog_item" in url_markers:
+        link_type = "catalogItemUrl"
+        link_title = "Sciencebase catalog parent item"
+
+    if link_type is None:
+        link_type = "webLink"
+
+    return url_string, link_type, link_title
+
+
 class webLinkHandler:
 
     def __init__(self, url_string):
         self.url_string = url_string
-        self.image_regex_pattern = re.compile('.(?:jpg|jpeg|tiff|gif|png)$', re.IGNORECASE)
-        self.archive_regex_pattern = re.compile('.(?:pdf|doc|tif|zip|gz|tar|7z|laz)$', re.IGNORECASE)
-        self.csw_portal_regex_pattern = re.compile('.*thumbnail.*', re.IGNORECASE)
-        self.ogc_regex_pattern = re.compile('.*thumbnail.*', re.IGNORECASE)
-        self.wms_regex_pattern = re.compile('.*service=wms.*', re.IGNORECASE)
-        self.wfs_regex_pattern = re.compile('.*service=wfs.*', re.IGNORECASE)
-        self.legend_regex_pattern = re.compile('.*request=getLegendGraphic.*', re.IGNORECASE)
-        self.feature_info_regex_pattern = re.compile('.*request=getFeatureInfo.*', re.IGNORECASE)
-        self.original_metadata_regex_pattern = re.compile('.*getxml=.*', re.IGNORECASE)
-        self.catalog_item_regex_pattern = re.compile('.*sciencebase.gov/catalog/(item|folder).*')
 
     def create_web_link(self, rel="related", hidden=False):
         """
@@ -23,46 +84,13 @@ class webLinkHandler:
         :param hidden: Boolean value for whether a web link is hidden
         :return: A dictionary with data for a web link
         """
-        url_string = self.url_string.replace(" ", "%20")
-        url_string = url_string.replace("[<|>]", "")
+        url_string, link_type, link_title = classify_web_link(self.url_string)
         new_link = {}
-        last_dot_index = url_string.rfind(".")
         new_link["uri"] = url_string
-        if last_dot_index > 0:
-            extension = url_string[last_dot_index:]
-            if self.image_regex_pattern.search(extension):
-                new_link["type"] = "browseImage"
-            elif self.archive_regex_pattern.search(extension):
-                new_link["type"] = "download"
-        if self.csw_portal_regex_pattern.search(url_string):
-            new_link["type"] = "browseImage"
-        if self.ogc_regex_pattern.search(url_string):
-            new_link["type"] = "serviceCapabilitiesUrl"
-            if self.wms_regex_pattern.search(url_string):
-                new_link["title"] = "OGC WMS Capabilities"
-            elif self.wfs_regex_pattern.search(url_string):
-                new_link["type"] = "serviceWfsBackingUrl"
-                new_link["title"] = "OGC WFS Capabilities"
-            else:
-                new_link["title"] = "OGC Capabilities"
-        elif self.legend_regex_pattern.search(url_string):
-            new_link["type"] = "serviceLegendUrl"
-            new_link["title"] = "Legend"
-        elif self.feature_info_regex_pattern.search(url_string):
-            new_link["type"] = "serviceFeatureInfoUrl"
-            new_link["title"] = "Feature Info"
-        elif self.original_metadata_regex_pattern.search(url_string):
-            new_link["type"] = "originalMetadata"
-            new_link["title"] = "Original Metadata (XML)"
-        elif self.catalog_item_regex_pattern.search(url_string):
-            new_link["type"] = "catalogItemUrl"
-            new_link["title"] = "Sciencebase catalog parent item"
-
-        if "type" not in new_link:
-            new_link["type"] = "webLink"
-
+        new_link["type"] = link_type
+        if link_title is not None:
+            new_link["title"] = link_title
         new_link["rel"] = rel
         new_link["hidden"] = hidden
 
         return new_link
-
@@ -0,0 +1,19 @@
+from Datetime_Utils import normalize_date_string, normalize_datetime
+
+
+def test_invalid_month_and_day_are_rejected():
+    assert normalize_date_string("2012-13-45") == ""
+    assert normalize_date_string("2012-02-30") == ""
+    assert normalize_date_string("2012-13") == ""
+    assert normalize_datetime("2012-13-45", "1230") == "12:30"
+
+
+def test_non_padded_dates_are_zero_padded():
+    assert normalize_date_string("2012-5-1") == "2012-05-01"
+    assert normalize_date_string("2012-5") == "2012-05"
+    assert normalize_datetime("2012-5-1", "1230") == "2012-05-01T12:30"
+
+
+def test_padded_dates_are_unchanged():
+    assert normalize_datetime("2012-05-01", "12:30:00") == "2012-05-01T12:30:00"
+    assert normalize_date_string("2012") == "2012"
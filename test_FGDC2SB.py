@@ -0,0 +1,31 @@
+from FGDC2SB import FGDC2SB
+from Index_Utils import split_bounding_box
+
+
+def convert_bounding(bounding_xml):
+    xml_bytes = ("<metadata><idinfo><citation><citeinfo><title>Box</title></citeinfo></citation>"
+                 "<spdom>%s</spdom></idinfo></metadata>" % bounding_xml).encode("utf-8")
+    converter = FGDC2SB(check_email_deliverability=False)
+
+    return converter.convert(xml_bytes)["spatial"]["boundingBox"]
+
+
+def get_bounding_xml(west, east, south=0, north=10):
+    return ("<bounding><westbc>%s</westbc><eastbc>%s</eastbc><northbc>%s</northbc><southbc>%s</southbc></bounding>"
+            % (west, east, north, south))
+
+
+def test_single_box_crossing_the_antimeridian():
+    bounding_box = convert_bounding(get_bounding_xml(170, -170))
+    assert bounding_box == {"minX": 170.0, "maxX": -170.0, "minY": 0.0, "maxY": 10.0}
+    assert split_bounding_box(bounding_box) == [(170.0, 0.0, 180.0, 10.0), (-180.0, 0.0, -170.0, 10.0)]
+
+
+def test_crossing_box_is_written_the_same_with_other_extents():
+    bounding_box = convert_bounding(get_bounding_xml(170, -170) + get_bounding_xml(175, 179))
+    assert (bounding_box["minX"], bounding_box["maxX"]) == (170.0, -170.0)
+
+
+def test_single_box_entered_in_the_wrong_order():
+    bounding_box = convert_bounding(get_bounding_xml(-69.9, -70.7))
+    assert (bounding_box["minX"], bounding_box["maxX"]) == (-70.7, -69.9)